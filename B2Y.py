@@ -1,44 +1,151 @@
-import subprocess
+import os
 import re
 import sys
+import queue
+import threading
+import argparse
+from Upload_to_Youtube import YoutubeUploader, reclaim_file
 
-def get_aid_and_filename(cmd_args):
-    cmd = ["BBDown.exe"]
+# BBDown 输出解析与 bili-super-downloader 共用 tools/bbdown_stream.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+from bbdown_stream import run_bbdown, DEFAULT_STALL_TIMEOUT
+
+# BBDown 可执行文件，可通过环境变量 BBDOWN 指定
+BBDOWN = os.getenv('BBDOWN', 'BBDown.exe' if os.name == 'nt' else 'BBDown')
+
+# 哔哩哔哩视频ID / 链接识别（BV号、av号、b23短链、完整视频链接）
+ITEM_PATTERN = re.compile(r"^(BV[0-9A-Za-z]{10}|av\d+|https?://\S+)$", re.IGNORECASE)
+
+# 队列结束标记
+_SENTINEL = None
+
+def print_bbdown_event(event):
+    # 进度在同一行刷新，其余输出逐行打印
+    if event.type == 'progress':
+        print(f"\r{event.line.strip()}", end='', flush=True)
+    else:
+        print(f"\r{event.line}", flush=True)
+
+def get_aid_and_filename(cmd_args, stall_timeout=DEFAULT_STALL_TIMEOUT):
+    cmd = [BBDOWN]
     cmd.extend(cmd_args)
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    aid_pattern = r"获取aid结束: (\d+)"
-    filename_pattern = r"视频标题: (.+)"
-    
-    aid_match = re.search(aid_pattern, result.stdout)
-    filename_match = re.search(filename_pattern, result.stdout)
-    
-    if aid_match and filename_match:
-        aid = aid_match.group(1)
-        filename = filename_match.group(1) + ".mp4"
-        return aid, filename
+    result = run_bbdown(cmd, on_event=print_bbdown_event, stall_timeout=stall_timeout)
+
+    if result.returncode is None and result.output:
+        # BBDown 未能启动
+        print(result.output[-1])
+    if result.stalled or result.timed_out:
+        return None, None
+    if result.aid and result.title:
+        return result.aid, result.title + ".mp4"
     else:
         return None, None
 
-def upload_video(filename, aid):
-    upload_cmd = [
-        "python", "Upload_to_Youtube.py",
-        "-f", filename,
-        "-d", f"转载自哔哩哔哩，原视频ID为{aid}"
-    ]
-    subprocess.run(upload_cmd)
-
-# 获取命令行参数
-cmd_args = sys.argv[1:]
-
-# 获取AID和文件名
-aid, filename = get_aid_and_filename(cmd_args)
-
-if aid and filename:
-    print(f"AID: {aid}")
-    print(f"文件名: {filename}")
-    
-    # 执行上传操作
-    upload_video(filename, aid)
-else:
-    print("无法获取AID或文件名。")
+def upload_video(uploader, filename, aid):
+    job = {
+        'file': filename,
+        'description': f"转载自哔哩哔哩，原视频ID为{aid}"
+    }
+    response = uploader.upload(job)
+    print(response)
+
+def read_items(list_file):
+    # 从列表文件读取待处理的ID或链接，忽略空行和#注释
+    items = []
+    with open(list_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                items.append(line)
+    return items
+
+def download_worker(items, bbdown_args, upload_queue, results, stall_timeout=DEFAULT_STALL_TIMEOUT):
+    # 下载阶段：逐个下载，完成后放入有界队列；队列满时阻塞，限制已下载未上传的文件数量
+    # 无论下载线程如何结束都要放入结束标记，否则上传线程会一直等待
+    try:
+        for item in items:
+            try:
+                aid, filename = get_aid_and_filename([item] + bbdown_args, stall_timeout)
+            except Exception as e:
+                print(f"[下载失败] {item}: {e}")
+                results.append((item, False))
+                continue
+            if aid and filename:
+                print(f"[下载完成] {item} -> AID: {aid}, 文件名: {filename}")
+                upload_queue.put((item, aid, filename))
+            else:
+                print(f"[下载失败] {item}: 无法获取AID或文件名。")
+                results.append((item, False))
+    finally:
+        upload_queue.put(_SENTINEL)
+
+def upload_worker(upload_queue, results, reclaim='keep'):
+    # 上传阶段：与下一个视频的下载并行执行，整个批次共用一个已认证的上传器
+    uploader = None
+    while True:
+        job = upload_queue.get()
+        if job is _SENTINEL:
+            break
+        item, aid, filename = job
+        print(f"[开始上传] {filename}")
+        try:
+            if uploader is None:
+                uploader = YoutubeUploader()
+            upload_video(uploader, filename, aid)
+            results.append((item, True))
+        except Exception as e:
+            print(f"[上传失败] {filename}: {e}")
+            results.append((item, False))
+            continue
+        # 上传成功后按 --reclaim 回收本地文件，释放下载空间
+        try:
+            reclaim_file(filename, reclaim)
+        except Exception as e:
+            print(f"[回收失败] {filename}: {e}")
+
+def run_pipeline(items, bbdown_args, queue_size=1, stall_timeout=DEFAULT_STALL_TIMEOUT, reclaim='keep'):
+    upload_queue = queue.Queue(maxsize=max(1, queue_size))
+    results = []
+
+    downloader = threading.Thread(
+        target=download_worker, args=(items, bbdown_args, upload_queue, results, stall_timeout), daemon=True
+    )
+    uploader = threading.Thread(target=upload_worker, args=(upload_queue, results, reclaim), daemon=True)
+    downloader.start()
+    uploader.start()
+    downloader.join()
+    uploader.join()
+    return results
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='哔哩哔哩下载并上传到Youtube，下载与上传流水线并行执行。其余参数原样传递给BBDown。'
+    )
+    parser.add_argument('--list', dest='list_file', help='包含多个BV号或链接的列表文件，每行一个。')
+    parser.add_argument('--queue-size', type=int, default=1,
+                        help='已下载待上传的最大视频数，用于限制磁盘占用（默认: 1）。')
+    parser.add_argument('--stall-timeout', type=float, default=DEFAULT_STALL_TIMEOUT,
+                        help=f'BBDown 超过此秒数没有进展时结束下载（默认: {DEFAULT_STALL_TIMEOUT}）。')
+    parser.add_argument('--reclaim', choices=['keep', 'trash', 'delete'], default='keep',
+                        help='上传成功后如何处理本地文件：keep 保留（默认），trash 移到回收站，delete 直接删除。')
+    args, rest = parser.parse_known_args(argv)
+
+    # 识别出的视频ID/链接作为任务，其余作为BBDown参数
+    items = [arg for arg in rest if ITEM_PATTERN.match(arg)]
+    bbdown_args = [arg for arg in rest if not ITEM_PATTERN.match(arg)]
+    if args.list_file:
+        items.extend(read_items(args.list_file))
+    return args, items, bbdown_args
+
+if __name__ == '__main__':
+    # 获取命令行参数
+    args, items, bbdown_args = parse_args(sys.argv[1:])
+
+    if not items:
+        print("未提供任何BV号或链接。")
+        sys.exit(1)
+
+    results = run_pipeline(items, bbdown_args, queue_size=args.queue_size, stall_timeout=args.stall_timeout,
+                           reclaim=args.reclaim)
+    succeeded = sum(1 for _, ok in results if ok)
+    print(f"全部完成：成功 {succeeded}，失败 {len(results) - succeeded}")
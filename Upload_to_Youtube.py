@@ -1,40 +1,268 @@
 import socket
 import socks
 import os
+import json
+import time
+import random
+import sys
+import threading
 import argparse
+import mimetypes
+import concurrent.futures
+from datetime import datetime, timedelta, timezone
+import httplib2
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 import pickle
 
+# 任务日志与 bili-super-downloader 共用 tools/job_journal.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+from job_journal import JobJournal, DEFAULT_JOURNAL_FILE, UPLOADED
+
+# 断点续传状态文件后缀（保存在视频文件旁）
+UPLOAD_STATE_SUFFIX = '.upload-state.json'
+# 可重试的服务端错误码
+RETRIABLE_STATUS_CODES = [500, 502, 503, 504]
+# 上传会话失效（过期或被服务端丢弃）时的错误码
+EXPIRED_SESSION_STATUS_CODES = [404, 410]
+MAX_RETRIES = 10
+# videos.insert 每次调用消耗的API配额单位
+QUOTA_COST_INSERT = 1600
+QUOTA_STATE_FILE = 'upload-quota.json'
+
+# YouTube API 配额在太平洋时间零点重置
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+except Exception:
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
 def set_socks5_proxy(host, port):
     socks.set_default_proxy(socks.SOCKS5, host, port)
     socket.socket = socks.socksocket
 
-def upload_video(args):
-    if args.socks5:
-        host, port = args.socks5.split(":")
-        set_socks5_proxy(host, int(port))
+class TokenBucket:
+    """令牌桶限速器：所有上传线程共享，总发送速率不超过 rate 字节/秒"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        while amount > 0:
+            part = min(amount, self.capacity)
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= part:
+                    self.tokens -= part
+                    amount -= part
+                    continue
+                wait = (part - self.tokens) / self.rate
+            time.sleep(wait)
+
+class ThrottledReader:
+    """按令牌桶速率读取文件；http.client 分块读取请求体，因此限制的是实际发送速率"""
+
+    def __init__(self, fd, bucket):
+        self._fd = fd
+        self._bucket = bucket
+
+    def read(self, size=-1):
+        data = self._fd.read(size)
+        if data:
+            self._bucket.consume(len(data))
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._fd.seek(offset, whence)
+
+    def tell(self):
+        return self._fd.tell()
+
+    def close(self):
+        self._fd.close()
+
+class QuotaBudget:
+    """每日API配额预算：超出预算的任务排队等待，配额窗口重置后继续"""
+
+    def __init__(self, daily_budget, state_path=QUOTA_STATE_FILE):
+        self.daily_budget = daily_budget
+        self.state_path = state_path
+        self.lock = threading.Lock()
+        self.window = self._current_window()
+        self.used = 0
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get('window') == self.window:
+                    self.used = state.get('used', 0)
+            except (OSError, ValueError) as e:
+                print(f"读取配额状态失败，从零开始计算: {e}")
+
+    def _current_window(self):
+        return datetime.now(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+    def _seconds_until_reset(self):
+        now = datetime.now(QUOTA_TIMEZONE)
+        tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (tomorrow - now).total_seconds()
+
+    def _save(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'window': self.window, 'used': self.used}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _roll_window(self):
+        window = self._current_window()
+        if window != self.window:
+            self.window = window
+            self.used = 0
+
+    def acquire(self, cost=QUOTA_COST_INSERT):
+        while True:
+            with self.lock:
+                self._roll_window()
+                if self.used + cost <= self.daily_budget:
+                    self.used += cost
+                    self._save()
+                    return
+                wait = self._seconds_until_reset() + 60
+                used = self.used
+            print(f"今日API配额不足（已用 {used}/{self.daily_budget}），等待 {wait / 3600:.1f} 小时后配额重置")
+            # 分段等待，便于中途重新检查窗口
+            time.sleep(min(wait, 600))
+
+    def exhaust(self):
+        # 服务端返回 quotaExceeded 时，以服务端为准把本窗口记为用尽
+        with self.lock:
+            self._roll_window()
+            self.used = self.daily_budget
+            self._save()
+
+def is_quota_exceeded(error):
+    return error.resp.status == 403 and b'quotaExceeded' in (error.content or b'')
+
+def load_upload_state(state_path, file_path):
+    # 仅当状态文件对应同一个文件（大小和修改时间一致）时才续传
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    stat = os.stat(file_path)
+    if state.get('size') != stat.st_size or state.get('mtime') != int(stat.st_mtime):
+        print(f"状态文件与视频文件不匹配，重新开始上传: {state_path}")
+        return None
+    return state
+
+def save_upload_state(state_path, file_path, resumable_uri, progress):
+    # 先写临时文件再替换，避免进程中断时留下损坏的状态文件
+    stat = os.stat(file_path)
+    state = {
+        'file': os.path.abspath(file_path),
+        'size': stat.st_size,
+        'mtime': int(stat.st_mtime),
+        'resumable_uri': resumable_uri,
+        'progress': progress
+    }
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+def resumable_upload(request, file_path, state_path):
+    state = load_upload_state(state_path, file_path)
+    if state:
+        # 复用已有的上传会话，首次请求会先向服务端查询已确认的字节偏移
+        request.resumable_uri = state['resumable_uri']
+        request.resumable_progress = state['progress']
+        request._in_error_state = True
+        print(f"继续上次的上传，已确认 {state['progress']} 字节")
+
+    response = None
+    retry = 0
+    while response is None:
+        error = None
+        try:
+            status, response = request.next_chunk()
+            retry = 0
+            if status:
+                save_upload_state(state_path, file_path, request.resumable_uri, request.resumable_progress)
+                print(f"上传进度: {int(status.progress() * 100)}%")
+        except HttpError as e:
+            if state and e.resp.status in EXPIRED_SESSION_STATUS_CODES:
+                # 会话已失效，只能从头开始
+                print("上传会话已失效，重新开始上传")
+                state = None
+                request.resumable_uri = None
+                request.resumable_progress = 0
+                request._in_error_state = False
+                os.remove(state_path)
+                continue
+            if e.resp.status not in RETRIABLE_STATUS_CODES:
+                raise
+            error = f"服务端错误 {e.resp.status}"
+        except (IOError, httplib2.HttpLib2Error) as e:
+            error = f"网络错误: {e}"
 
+        if error:
+            if request.resumable_uri:
+                save_upload_state(state_path, file_path, request.resumable_uri, request.resumable_progress)
+            retry += 1
+            if retry > MAX_RETRIES:
+                raise Exception(f"上传失败，已达到最大重试次数。状态已保存，可再次运行继续上传: {state_path}")
+            sleep_seconds = random.random() * (2 ** retry)
+            print(f"{error}，{sleep_seconds:.1f} 秒后重试（第{retry}次）")
+            time.sleep(sleep_seconds)
+
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return response
+
+def get_credentials():
     creds = None
     if os.path.exists('token.pickle'):
         with open('token.pickle', 'rb') as token:
             creds = pickle.load(token)
 
+    if creds and not creds.valid and creds.expired and creds.refresh_token:
+        # 令牌过期时只刷新，不重新走OAuth流程
+        try:
+            creds.refresh(Request())
+            save_credentials(creds)
+        except Exception as e:
+            print(f"刷新令牌失败，重新认证: {e}")
+            creds = None
+
     if not creds or not creds.valid:
         flow = InstalledAppFlow.from_client_secrets_file(
             'client_secrets.json', 
             scopes=['https://www.googleapis.com/auth/youtube.upload']
         )
         creds = flow.run_local_server(port=58080)
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
+        save_credentials(creds)
+    return creds
 
-    youtube = build('youtube', 'v3', credentials=creds)
+def save_credentials(creds):
+    with open('token.pickle', 'wb') as token:
+        pickle.dump(creds, token)
 
-    title = args.title if args.title else os.path.splitext(os.path.basename(args.file))[0]
-    description = args.description if args.description else os.path.basename(args.file)
+def build_body(job):
+    file_path = job['file']
+    title = job.get('title') or os.path.splitext(os.path.basename(file_path))[0]
+    description = job.get('description') or os.path.basename(file_path)
     body_dict = {
         'snippet': {
             'description': description,
@@ -44,27 +272,266 @@ def upload_video(args):
             'privacyStatus': 'private'
         }
     }
-    if args.categoryId:
-        body_dict['snippet']['categoryId'] = args.categoryId
-    if args.playlist:
-        body_dict['snippet']['playlistId'] = args.playlist
-    
-    request = youtube.videos().insert(
-        part='snippet,status',
-        body=body_dict,
-        media_body=MediaFileUpload(args.file)
-    )
-
-    response = request.execute()
-    print(response)
+    if job.get('categoryId'):
+        body_dict['snippet']['categoryId'] = job['categoryId']
+    if job.get('playlist'):
+        body_dict['snippet']['playlistId'] = job['playlist']
+    return body_dict
+
+def insert_video(youtube, job, bucket=None):
+    file_path = job['file']
+    # 限速依赖分块发送，启用带宽限制时强制使用断点续传模式
+    resumable = job.get('resumable', False) or bucket is not None
+    chunk_size = int(job.get('chunk_size') or 8) * 1024 * 1024
+    reader = None
+    if bucket is not None:
+        mimetype = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        reader = ThrottledReader(open(file_path, 'rb'), bucket)
+        media_body = MediaIoBaseUpload(reader, mimetype, chunksize=chunk_size, resumable=True)
+    elif resumable:
+        media_body = MediaFileUpload(file_path, chunksize=chunk_size, resumable=True)
+    else:
+        media_body = MediaFileUpload(file_path)
+
+    try:
+        request = youtube.videos().insert(
+            part='snippet,status',
+            body=build_body(job),
+            media_body=media_body
+        )
+
+        if resumable:
+            state_path = job.get('state_file') or file_path + UPLOAD_STATE_SUFFIX
+            return resumable_upload(request, file_path, state_path)
+        return request.execute()
+    finally:
+        if reader is not None:
+            reader.close()
+
+class YoutubeUploader:
+    """常驻上传器：复用同一份凭据，每个工作线程复用一个客户端及其连接"""
+
+    def __init__(self, creds=None, bucket=None, quota=None):
+        self.creds = creds or get_credentials()
+        self.bucket = bucket
+        self.quota = quota
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+
+    def _get_client(self):
+        # httplib2连接不是线程安全的，因此每个线程各自构建一次客户端并保持复用
+        youtube = getattr(self._local, 'youtube', None)
+        if youtube is None:
+            youtube = build('youtube', 'v3', credentials=self.creds, cache_discovery=False)
+            self._local.youtube = youtube
+        return youtube
+
+    def _ensure_valid_token(self):
+        # 多个线程共享凭据，令牌过期时只由一个线程刷新
+        with self._refresh_lock:
+            if not self.creds.valid and self.creds.refresh_token:
+                self.creds.refresh(Request())
+                save_credentials(self.creds)
+
+    def upload(self, job):
+        while True:
+            if self.quota:
+                self.quota.acquire()
+            self._ensure_valid_token()
+            try:
+                return insert_video(self._get_client(), job, self.bucket)
+            except HttpError as e:
+                if not (self.quota and is_quota_exceeded(e)):
+                    raise
+                # 配额提前耗尽，任务重新排队等待下一个配额窗口
+                print(f"API配额已耗尽，任务排队等待: {job['file']}")
+                self.quota.exhaust()
+
+def iter_jobs_from_lines(lines):
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError:
+            # 兼容直接写文件路径的简单格式
+            job = {'file': line}
+        yield job
+
+def iter_jobs_from_file(jobs_file):
+    with open(jobs_file, 'r', encoding='utf-8') as f:
+        yield from iter_jobs_from_lines(f)
+
+def requeue_stale_jobs(jobs_dir, stale_after=0):
+    # 上传器崩溃后遗留的 .working 任务改回 .json 重新排队；stale_after 大于0时只处理
+    # 认领超过该秒数的任务，多个上传器共用任务目录时避免抢走其他上传器正在处理的任务
+    now = time.time()
+    for name in os.listdir(jobs_dir):
+        if not name.endswith('.json.working'):
+            continue
+        working_path = os.path.join(jobs_dir, name)
+        try:
+            if stale_after > 0 and now - os.path.getmtime(working_path) < stale_after:
+                continue
+            os.rename(working_path, working_path[:-len('.working')])
+            print(f"重新排队未完成的任务: {name[:-len('.working')]}")
+        except OSError:
+            continue
+
+def iter_jobs_from_dir(jobs_dir, poll_interval, stale_after=0):
+    # 目录模式：每个任务是一个 .json 文件，认领时改名为 .working，避免多个上传器重复处理
+    requeue_stale_jobs(jobs_dir, stale_after)
+    while True:
+        if stale_after > 0:
+            requeue_stale_jobs(jobs_dir, stale_after)
+        found = False
+        for name in sorted(os.listdir(jobs_dir)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(jobs_dir, name)
+            working_path = path + '.working'
+            try:
+                os.rename(path, working_path)
+                os.utime(working_path)  # 记录认领时间
+            except OSError:
+                continue
+            found = True
+            try:
+                with open(working_path, 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"无法读取任务文件 {name}: {e}")
+                os.replace(working_path, path + '.failed')
+                continue
+            job['_job_path'] = path
+            yield job
+        if not found:
+            time.sleep(poll_interval)
+
+def finish_job(job, success):
+    # 目录模式下按结果重命名任务文件；任务文件已被移走（如超过 --stale-after 后被重新排队）时跳过
+    job_path = job.get('_job_path')
+    if not job_path:
+        return
+    try:
+        os.replace(job_path + '.working', job_path + ('.done' if success else '.failed'))
+    except FileNotFoundError:
+        print(f"任务文件已不在处理中，未标记结果: {job_path}")
+
+def reclaim_file(file_path, policy):
+    # 上传成功后回收本地文件：trash 移到回收站，delete 直接删除
+    if policy == 'keep' or not os.path.isfile(file_path):
+        return
+    if policy == 'trash':
+        from send2trash import send2trash
+        send2trash(file_path)
+    else:
+        os.remove(file_path)
+    print(f"已回收本地文件（{policy}）: {file_path}")
+
+def mark_uploaded(journal, job):
+    # 任务中带 video_id 时按ID更新，否则按文件路径查找下载任务
+    if 'video_id' in job:
+        journal.set_state(job.get('platform', 'bilibili'), job['video_id'], UPLOADED)
+        return
+    entry = journal.find_by_path(job['file'])
+    if entry:
+        journal.set_state(entry['platform'], entry['video_id'], UPLOADED)
+
+def run_uploads(args, jobs, print_response=False):
+    bucket = TokenBucket(args.bwlimit * 1024) if args.bwlimit else None
+    quota = QuotaBudget(args.quota_budget, args.quota_state) if args.quota_budget else None
+    uploader = YoutubeUploader(bucket=bucket, quota=quota)
+    journal = JobJournal(args.journal) if args.journal else None
+    failed = []
+
+    def run_job(job):
+        job.setdefault('resumable', args.resumable)
+        job.setdefault('chunk_size', args.chunk_size)
+        try:
+            response = uploader.upload(job)
+        except Exception as e:
+            print(json.dumps({'file': job['file'], 'success': False, 'error': str(e)}, ensure_ascii=False))
+            finish_job(job, False)
+            failed.append(job['file'])
+            return
+        if print_response:
+            print(response)
+        else:
+            print(json.dumps({'file': job['file'], 'success': True, 'id': response.get('id')}, ensure_ascii=False))
+        # 上传已经成功，之后的记录和回收出错不能把任务标记为失败
+        if journal:
+            try:
+                mark_uploaded(journal, job)
+            except Exception as e:
+                print(f"更新任务日志失败 {job['file']}: {e}")
+        finish_job(job, True)
+        try:
+            reclaim_file(job['file'], args.reclaim)
+        except Exception as e:
+            print(f"回收本地文件失败 {job['file']}: {e}")
+
+    # 信号量限制已提交未完成的任务数，避免一次性读入整个任务队列
+    slots = threading.Semaphore(args.workers)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for job in jobs:
+            slots.acquire()
+            future = executor.submit(run_job, job)
+            future.add_done_callback(lambda _: slots.release())
+    return failed
+
+def upload_video(args):
+    if args.socks5:
+        host, port = args.socks5.split(":")
+        set_socks5_proxy(host, int(port))
+
+    if args.jobs_dir:
+        return run_uploads(args, iter_jobs_from_dir(args.jobs_dir, args.poll_interval, args.stale_after))
+    elif args.jobs == '-':
+        return run_uploads(args, iter_jobs_from_lines(sys.stdin))
+    elif args.jobs:
+        return run_uploads(args, iter_jobs_from_file(args.jobs))
+    else:
+        # -f 可指定多个文件；单个文件、单个工作线程即原有的单文件上传
+        jobs = [
+            {
+                'file': file_path,
+                'title': args.title,
+                'description': args.description,
+                'categoryId': args.categoryId,
+                'playlist': args.playlist,
+                'state_file': args.state_file if len(args.file) == 1 else None
+            }
+            for file_path in args.file
+        ]
+        return run_uploads(args, jobs, print_response=True)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Upload a video to YouTube.')
-    parser.add_argument('-f', '--file', default='test.mp4', help='Path to the video file.')
+    parser.add_argument('-f', '--file', nargs='+', default=['test.mp4'], help='Path(s) to the video file(s).')
     parser.add_argument('-s', '--socks5', help='SOCKS5 proxy in format host:port.')
     parser.add_argument('-t', '--title', help='Title of the uploaded video.')
     parser.add_argument('-d', '--description', help='Description of the uploaded video.')
     parser.add_argument('-g', '--categoryId', help='Category ID of the uploaded video.')
     parser.add_argument('-l', '--playlist', help='Playlist ID for the uploaded video.')
+    parser.add_argument('-r', '--resumable', action='store_true', help='Upload in chunks and resume interrupted uploads.')
+    parser.add_argument('--chunk-size', type=int, default=8, help='Chunk size in MB for resumable uploads.')
+    parser.add_argument('--state-file', help='Path of the resumable upload state file (default: <file>.upload-state.json).')
+    parser.add_argument('--jobs', help='Run as a long-lived uploader reading jsonl jobs from this file, or "-" for stdin.')
+    parser.add_argument('--jobs-dir', help='Run as a long-lived uploader watching this directory for *.json job files.')
+    parser.add_argument('--poll-interval', type=float, default=5, help='Seconds between scans of --jobs-dir.')
+    parser.add_argument('--stale-after', type=float, default=0,
+                        help='Re-queue *.json.working jobs in --jobs-dir left by a crashed uploader. 0 (default) re-queues all of them at start-up; '
+                             'with several uploaders sharing the directory, set it to the longest expected upload time in seconds so only jobs claimed longer ago are re-queued.')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Number of concurrent uploads.')
+    parser.add_argument('--bwlimit', type=int, help='Total upload bandwidth limit in KB/s shared by all workers (implies chunked uploads).')
+    parser.add_argument('--quota-budget', type=int, help='Daily API quota budget; uploads over it wait for the next quota window (videos.insert costs 1600).')
+    parser.add_argument('--quota-state', default=QUOTA_STATE_FILE, help='File that records quota used in the current window.')
+    parser.add_argument('--reclaim', choices=['keep', 'trash', 'delete'], default='keep',
+                        help='What to do with the local file after a confirmed upload: keep it (default), move it to the trash, or delete it.')
+    parser.add_argument('--journal', nargs='?', const=DEFAULT_JOURNAL_FILE,
+                        help=f'Mark uploaded videos in the downloader job journal (default path: {DEFAULT_JOURNAL_FILE}).')
     args = parser.parse_args()
-    upload_video(args)
+    failed = upload_video(args)
+    sys.exit(1 if failed else 0)
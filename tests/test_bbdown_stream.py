@@ -0,0 +1,28 @@
+"""BBDown 输出解析：多字节字符被读取分块截断时仍能正确解码"""
+
+import io
+import os
+import sys
+import queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+import bbdown_stream
+
+
+def read_all(data: bytes):
+    lines = queue.Queue()
+    bbdown_stream._read_lines(io.BufferedReader(io.BytesIO(data)), lines)
+    return list(iter(lines.get, None))
+
+
+def test_title_split_across_chunks(monkeypatch):
+    monkeypatch.setattr(bbdown_stream.locale, 'getpreferredencoding', lambda do_setlocale=True: 'utf-8')
+    prefix = 'x' * 4090 + '\n'
+    data = (prefix + '视频标题: 中文标题\r100%\n').encode('utf-8')
+    # 第4096字节落在“频”字中间
+    assert len(prefix.encode('utf-8')) + len('视频'.encode('utf-8')) > 4096 > len(prefix.encode('utf-8')) + 3
+
+    lines = read_all(data)
+
+    assert lines == ['x' * 4090, '视频标题: 中文标题', '100%']
+    assert bbdown_stream.parse_line(lines[1]).title == '中文标题'
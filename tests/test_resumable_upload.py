@@ -0,0 +1,169 @@
+"""断点续传上传：用本地 HTTP 服务模拟 YouTube 的 resumable upload 协议"""
+
+import os
+import re
+import sys
+import json
+import types
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+from googleapiclient.http import HttpRequest, MediaFileUpload, build_http
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Upload_to_Youtube as uploader
+
+CHUNK_SIZE = 256 * 1024
+FILE_SIZE = CHUNK_SIZE * 4 + 1000
+CONTENT_RANGE = re.compile(r'bytes (?:(\d+)-(\d+)|\*)/(\d+)')
+
+
+class FakeUploadServer(ThreadingHTTPServer):
+    """POST 创建上传会话；PUT 按 Content-Range 接收分块，未完成时返回 308 + Range"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeUploadHandler)
+        self.sessions = {}  # 会话ID -> 已接收的数据
+        self.created = 0
+        self.down = False  # 为 True 时读完请求后直接断开连接，不返回响应
+        self.fail_after_chunks = None  # 接收到这么多分块后进入 down 状态
+        self.chunks = 0
+        self.completed = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class FakeUploadHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _reply(self, status, headers=None, body=b''):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _drop(self):
+        self.close_connection = True
+
+    def do_POST(self):
+        self._read_body()
+        self.server.created += 1
+        session_id = str(self.server.created)
+        self.server.sessions[session_id] = bytearray()
+        self._reply(200, {'Location': f'{self.server.url}/session/{session_id}'})
+
+    def do_PUT(self):
+        server = self.server
+        if server.down:
+            # 不读取请求体直接断开（httplib2 重连后重发的请求可能没有请求体）
+            return self._drop()
+        body = self._read_body()
+        received = server.sessions.get(self.path.rsplit('/', 1)[-1])
+        if received is None:
+            return self._reply(int(self.headers.get('X-Expired-Status', 404)))
+
+        start, _, total = CONTENT_RANGE.match(self.headers['Content-Range']).groups()
+        if start is not None:
+            if int(start) == len(received):
+                received.extend(body)
+            server.chunks += 1
+            if server.fail_after_chunks is not None and server.chunks >= server.fail_after_chunks:
+                # 这个分块已收到，但响应丢失，之后的请求全部断开
+                server.down = True
+                return self._drop()
+
+        if len(received) == int(total):
+            server.completed = bytes(received)
+            return self._reply(200, {'Content-Type': 'application/json'}, json.dumps({'id': 'video-id'}).encode())
+        headers = {'Range': f'bytes=0-{len(received) - 1}'} if received else {}
+        self._reply(308, headers)
+
+
+@pytest.fixture
+def server():
+    server = FakeUploadServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(os.urandom(FILE_SIZE))
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    # 重试前不等待
+    monkeypatch.setattr(uploader, 'random', types.SimpleNamespace(random=lambda: 0.0))
+
+
+def make_request(server, file_path):
+    media = MediaFileUpload(file_path, mimetype='video/mp4', chunksize=CHUNK_SIZE, resumable=True)
+    return HttpRequest(
+        build_http(), lambda resp, content: json.loads(content), f'{server.url}/upload',
+        method='POST', body='{}', headers={'content-type': 'application/json'}, resumable=media
+    )
+
+
+def test_upload_completes_in_chunks(server, video):
+    state_path = video + uploader.UPLOAD_STATE_SUFFIX
+    response = uploader.resumable_upload(make_request(server, video), video, state_path)
+
+    assert response == {'id': 'video-id'}
+    assert server.completed == open(video, 'rb').read()
+    assert server.created == 1
+    assert not os.path.exists(state_path)
+
+
+def test_resume_from_saved_state_after_connection_drop(server, video, monkeypatch):
+    state_path = video + uploader.UPLOAD_STATE_SUFFIX
+    monkeypatch.setattr(uploader, 'MAX_RETRIES', 1)
+    server.fail_after_chunks = 2
+
+    with pytest.raises(Exception, match='最大重试次数'):
+        uploader.resumable_upload(make_request(server, video), video, state_path)
+    state = json.load(open(state_path, encoding='utf-8'))
+    assert state['resumable_uri'] == f'{server.url}/session/1'
+
+    # 模拟重新运行：新的请求对象从状态文件恢复，向服务端查询偏移后继续上传
+    server.down = False
+    server.fail_after_chunks = None
+    response = uploader.resumable_upload(make_request(server, video), video, state_path)
+
+    assert response == {'id': 'video-id'}
+    assert server.created == 1
+    assert server.completed == open(video, 'rb').read()
+    assert not os.path.exists(state_path)
+
+
+@pytest.mark.parametrize('status', uploader.EXPIRED_SESSION_STATUS_CODES)
+def test_restart_when_saved_session_expired(server, video, status):
+    state_path = video + uploader.UPLOAD_STATE_SUFFIX
+    uploader.save_upload_state(state_path, video, f'{server.url}/session/expired', CHUNK_SIZE * 2)
+    request = make_request(server, video)
+    request.headers['X-Expired-Status'] = str(status)
+
+    response = uploader.resumable_upload(request, video, state_path)
+
+    assert response == {'id': 'video-id'}
+    assert server.created == 1
+    assert server.completed == open(video, 'rb').read()
+    assert not os.path.exists(state_path)
@@ -0,0 +1,89 @@
+"""single 模式并发下载：每个任务在各自的下载目录中运行 BBDown，不切换整个进程的工作目录"""
+
+import os
+import sys
+import json
+import importlib.util
+from pathlib import Path
+
+import pytest
+import yaml
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools')
+sys.path.insert(0, TOOLS_DIR)
+spec = importlib.util.spec_from_file_location('bili_super_downloader',
+                                              os.path.join(TOOLS_DIR, 'bili-super-downloader.py'))
+downloader = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(downloader)
+
+# 记录每次运行的工作目录；文件名只用标题、不含BV号，和 BBDown 默认的命名一致
+FAKE_BBDOWN = '''#!PYTHON
+import os, sys, json, time
+bvid = sys.argv[-1]
+with open(LOG, 'a', encoding='utf-8') as f:
+    f.write(json.dumps({'bvid': bvid, 'cwd': os.getcwd()}) + '\\n')
+print('获取aid结束: 1', flush=True)
+print(f'视频标题: 标题{bvid}', flush=True)
+time.sleep(0.5)  # 让各个下载同时进行
+with open(f'标题{bvid}.mp4', 'w') as f:
+    f.write('x' * 1000)
+print('100%', flush=True)
+'''
+
+BVIDS = ['BV1aa411c7aa', 'BV1bb411c7bb', 'BV1cc411c7cc', 'BV1dd411c7dd']
+
+
+@pytest.fixture
+def fake_bbdown(tmp_path, monkeypatch):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    log_path = tmp_path / 'bbdown.log'
+    script = bin_dir / 'bbdown'
+    script.write_text(FAKE_BBDOWN.replace('PYTHON', sys.executable, 1).replace('LOG', repr(str(log_path)), 1),
+                      encoding='utf-8')
+    script.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return log_path
+
+
+@pytest.fixture
+def manager(tmp_path):
+    config_path = tmp_path / 'bili-config.yaml'
+    config_path.write_text(yaml.safe_dump({
+        'auth': {'cookie': 'SESSDATA=test'},
+        'base': {'mode': 'single', 'download_dir': str(tmp_path / 'downloads')},
+        'uploader': {'single_mid': '1'},
+        'download': {
+            'max_workers': 4,
+            'archive_file': str(tmp_path / 'archive.db'),
+            'journal_file': str(tmp_path / 'jobs.db'),
+        },
+    }), encoding='utf-8')
+    return downloader.DownloadManager(downloader.BiliConfig(str(config_path)))
+
+
+def test_parallel_single_mode_runs_each_job_in_its_folder(tmp_path, fake_bbdown, manager):
+    cwd = os.getcwd()
+    folders = [manager.base_dir / f'up{i}' for i in range(2)]
+    for folder in folders:
+        folder.mkdir()
+    jobs = {folder: [downloader.VideoInfo(bvid=bvid, aid=0, title=bvid) for bvid in BVIDS[i::2]]
+            for i, folder in enumerate(folders)}
+
+    # 两个UP主的目录同时下载，每个目录内部也是多线程
+    with downloader.concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        stats = list(executor.map(lambda folder: manager.download_videos_batch(jobs[folder], folder), folders))
+
+    assert [s['success'] for s in stats] == [2, 2]
+    assert os.getcwd() == cwd
+    runs = [json.loads(line) for line in fake_bbdown.read_text(encoding='utf-8').splitlines()]
+    assert sorted(run['bvid'] for run in runs) == sorted(BVIDS)
+    for folder, videos in jobs.items():
+        for video in videos:
+            run = next(run for run in runs if run['bvid'] == video.bvid)
+            assert Path(run['cwd']) == folder
+            # 下载后按BBDown输出的标题找到实际文件并记录
+            assert video.download_path == str(folder / f'标题{video.bvid}.mp4')
+            assert os.path.isfile(video.download_path)
+            assert manager.index.get(folder, video.bvid) == f'标题{video.bvid}.mp4'
+    assert not any(name.endswith('.mp4') for name in os.listdir(cwd))
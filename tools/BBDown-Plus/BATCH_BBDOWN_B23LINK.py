@@ -1,22 +1,32 @@
 import re
 import sys
+from BATCH_BBDOWN_STREAM import iter_matches
 
-def extract_urls(file_path, mode='default'):
-    url_pattern = r'https://b23\.tv/[^\s]+'
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-        urls = re.findall(url_pattern, content)
-        if mode == 'bbdown':
-            urls = ['bbdown ' + url for url in urls]
-        return urls
+URL_PATTERN = re.compile(r'https://b23\.tv/[^\s]+')
+
+def iter_urls(file_path):
+    return iter_matches(file_path, URL_PATTERN)
+
+def extract_urls(file_path, mode='default', resolve=False):
+    # 分块流式读取，适用于很大的聊天记录导出文件；重复链接只保留第一次出现
+    urls = list(iter_urls(file_path))
+    if resolve:
+        # 展开短链接并按BV号去重，避免同一视频被下载多次；只在需要时导入，不使用 --resolve 时无需安装 requests
+        from BATCH_BBDOWN_RESOLVE import resolve_urls
+        urls = resolve_urls(urls)
+    if mode == 'bbdown':
+        urls = ['bbdown ' + url for url in urls]
+    return urls
 
 if __name__ == "__main__":
+    resolve = '--resolve' in sys.argv
+    sys.argv = [arg for arg in sys.argv if arg != '--resolve']
     if len(sys.argv) < 2:
-        print("Usage: python BATCH_GET_B23LINK.py <file_path> [mode]")
+        print("Usage: python BATCH_GET_B23LINK.py <file_path> [mode] [--resolve]")
         sys.exit(1)
 
     file_path = sys.argv[1]
     mode = sys.argv[2] if len(sys.argv) > 2 else 'default'
-    urls = extract_urls(file_path, mode)
+    urls = extract_urls(file_path, mode, resolve)
     for url in urls:
         print(url)
@@ -0,0 +1,111 @@
+import os
+import re
+import sys
+import json
+import threading
+import concurrent.futures
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+
+# 短链接 -> 跳转目标的映射是固定的，长期缓存在本地
+DEFAULT_CACHE_FILE = os.path.expanduser('~/.cache/bili_b23_links.json')
+DEFAULT_WORKERS = 16
+TIMEOUT = 10
+BVID_PATTERN = re.compile(r'BV[0-9A-Za-z]{10}')
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def load_cache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache_file, cache):
+    try:
+        os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+        tmp_file = cache_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as file:
+            json.dump(cache, file, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"保存短链接缓存失败: {e}", file=sys.stderr)
+
+def create_session(workers):
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def is_short_link(url):
+    return urllib.parse.urlsplit(url).netloc.lower() == 'b23.tv'
+
+def expand_short_link(session, url):
+    """只读取跳转目标，不下载页面内容；HEAD 不被支持时退回 GET"""
+    response = session.head(url, allow_redirects=False, timeout=TIMEOUT)
+    if response.status_code == 405:
+        response = session.get(url, allow_redirects=False, timeout=TIMEOUT, stream=True)
+        response.close()
+    location = response.headers.get('Location')
+    if response.status_code not in (301, 302, 303, 307, 308) or not location:
+        raise requests.RequestException(f"HTTP {response.status_code}，没有跳转地址")
+    return urllib.parse.urljoin(url, location)
+
+def canonicalize(url):
+    """返回 (去重键, 规范链接)；视频链接统一为 BV 号（多P保留分P参数），其它链接原样保留"""
+    match = BVID_PATTERN.search(url)
+    if not match:
+        return url, url
+    bvid = match.group(0)
+    page = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get('p', [None])[0]
+    canonical = f"https://www.bilibili.com/video/{bvid}"
+    if page and page != '1':
+        canonical += f"?p={page}"
+        return f"{bvid}:{page}", canonical
+    return bvid, canonical
+
+def resolve_urls(urls, cache_file=DEFAULT_CACHE_FILE, workers=DEFAULT_WORKERS):
+    """并发展开 b23.tv 短链接，按 BV 号去重，保持原有顺序"""
+    urls = [url if url.startswith('http') else 'https://' + url for url in urls]
+    cache = load_cache(cache_file) if cache_file else {}
+    pending = sorted({url for url in urls if is_short_link(url) and url not in cache})
+
+    if pending:
+        session = create_session(workers)
+        lock = threading.Lock()
+
+        def resolve(url):
+            try:
+                target = expand_short_link(session, url)
+            except requests.RequestException as e:
+                print(f"短链接解析失败，保留原链接: {url} ({e})", file=sys.stderr)
+                return
+            with lock:
+                cache[url] = target
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(resolve, pending))
+        if cache_file:
+            save_cache(cache_file, cache)
+
+    resolved = []
+    seen = set()
+    for url in urls:
+        key, canonical = canonicalize(cache.get(url, url))
+        if key in seen:
+            continue
+        seen.add(key)
+        resolved.append(canonical)
+    return resolved
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python BATCH_BBDOWN_RESOLVE.py <url>...")
+        sys.exit(1)
+    for url in resolve_urls(sys.argv[1:]):
+        print(url)
@@ -0,0 +1,193 @@
+import os
+import re
+import sys
+import time
+import asyncio
+import argparse
+
+# 与提取脚本位于同一目录，直接复用它们的 extract_urls
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from BATCH_BBDOWN_B23LINK import extract_urls as extract_b23_urls
+from BATCH_BBDOWN_BiliLINK import extract_urls as extract_bili_urls
+from BATCH_BBDOWN_RESOLVE import resolve_urls, DEFAULT_CACHE_FILE
+
+EXTRACTORS = {
+    'b23': extract_b23_urls,
+    'bili': extract_bili_urls,
+}
+
+# BBDown 输出中表示被风控/限流的特征
+THROTTLE_PATTERN = re.compile(r'\b(412|429) \(|Precondition Failed|Too Many Requests|-352|-412|请求过于频繁|请求被拦截')
+LINE_SPLIT_PATTERN = re.compile(r'[\r\n]+')
+
+class AdaptiveLimiter:
+    """并发上限自适应：连续成功后逐步增加，失败或被限流时减半"""
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = max(1, min(min_limit, max_limit))
+        self.limit = max_limit
+        self.active = 0
+        self.successes = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self, success, throttled):
+        async with self.condition:
+            self.active -= 1
+            if throttled or not success:
+                self.successes = 0
+                new_limit = max(self.min_limit, self.limit // 2)
+                if new_limit != self.limit:
+                    print(f"[并发] {'检测到限流' if throttled else '任务失败'}，并发数 {self.limit} -> {new_limit}")
+                self.limit = new_limit
+            else:
+                self.successes += 1
+                # 以当前并发数为一轮，整轮成功后并发数加一
+                if self.successes >= self.limit and self.limit < self.max_limit:
+                    self.successes = 0
+                    self.limit += 1
+                    print(f"[并发] 运行稳定，并发数提高到 {self.limit}")
+            self.condition.notify_all()
+
+def bbdown_command(bbdown, url, extra_args):
+    # 允许用 .py 脚本代替 BBDown（例如测试用的假程序）
+    if bbdown.endswith('.py'):
+        return [sys.executable, bbdown, url] + extra_args
+    return [bbdown, url] + extra_args
+
+async def run_job(job_id, url, args):
+    """运行一次 BBDown，实时输出日志，返回 (是否成功, 是否被限流)"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *bbdown_command(args.bbdown, url, args.bbdown_args),
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+    except OSError as e:
+        print(f"[{job_id}] 无法启动 {args.bbdown}: {e}")
+        return False, False
+
+    throttled = False
+    pending = ''
+    while True:
+        chunk = await process.stdout.read(4096)
+        if not chunk:
+            break
+        # 进度条使用 \r 刷新，按 \r 和 \n 切分后逐行输出
+        lines = LINE_SPLIT_PATTERN.split(pending + chunk.decode('utf-8', errors='replace'))
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                print(f"[{job_id}] {line}", flush=True)
+                throttled = throttled or bool(THROTTLE_PATTERN.search(line))
+    if pending.strip():
+        print(f"[{job_id}] {pending}", flush=True)
+        throttled = throttled or bool(THROTTLE_PATTERN.search(pending))
+
+    return_code = await process.wait()
+    return return_code == 0 and not throttled, throttled
+
+async def run_batch(urls, args):
+    limiter = AdaptiveLimiter(args.jobs, args.min_jobs)
+    job_queue = asyncio.Queue()
+    for index, url in enumerate(urls, 1):
+        job_queue.put_nowait((index, url, 1))
+
+    results = {}
+    remaining = len(urls)
+    done = asyncio.Event()
+    if remaining == 0:
+        done.set()
+
+    async def worker():
+        nonlocal remaining
+        while True:
+            index, url, attempt = await job_queue.get()
+            await limiter.acquire()
+            job_id = f"{index}/{len(urls)}" + (f" 重试{attempt - 1}" if attempt > 1 else '')
+            print(f"[{job_id}] 开始下载: {url}")
+            success, throttled = await run_job(job_id, url, args)
+            await limiter.release(success, throttled)
+
+            if success:
+                print(f"[{job_id}] 下载完成")
+            elif attempt <= args.retries:
+                # 放回重试队列，按尝试次数退避后再执行
+                delay = args.retry_delay * attempt
+                print(f"[{job_id}] 下载失败，{delay:.0f}秒后重试")
+                asyncio.get_running_loop().call_later(delay, job_queue.put_nowait, (index, url, attempt + 1))
+                continue
+            else:
+                print(f"[{job_id}] 下载失败，已放弃")
+            results[index] = (url, success, attempt)
+            remaining -= 1
+            if remaining == 0:
+                done.set()
+
+    # 工作协程数量取最大并发数，实际并发由 limiter 控制
+    workers = [asyncio.create_task(worker()) for _ in range(args.jobs)]
+    await done.wait()
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    return [results[index] for index in sorted(results)]
+
+def print_summary(results, elapsed, failed_file=None):
+    failed = [(url, attempts) for url, success, attempts in results if not success]
+    retried = sum(1 for _, success, attempts in results if success and attempts > 1)
+    print("\n========== 下载汇总 ==========")
+    print(f"总数: {len(results)}  成功: {len(results) - len(failed)}  失败: {len(failed)}  重试后成功: {retried}")
+    print(f"耗时: {elapsed:.1f}秒")
+    for url, attempts in failed:
+        print(f"  失败: {url}（尝试 {attempts} 次）")
+    if failed and failed_file:
+        with open(failed_file, 'w', encoding='utf-8') as file:
+            file.writelines(url + '\n' for url, _ in failed)
+        print(f"失败链接已写入 {failed_file}")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='批量调用 BBDown 下载，使用有上限的自适应并发。-- 之后的参数原样传递给 BBDown。')
+    parser.add_argument('file_path', help='包含链接的文本文件')
+    parser.add_argument('--source', choices=EXTRACTORS.keys(), default='bili',
+                        help='链接提取方式：b23 仅短链接，bili 包含 b23/www/m 域名（默认: bili）')
+    parser.add_argument('-j', '--jobs', type=int, default=10, help='最大并发数（默认: 10）')
+    parser.add_argument('--min-jobs', type=int, default=1, help='限流时并发数的下限（默认: 1）')
+    parser.add_argument('--retries', type=int, default=2, help='每个链接失败后的最大重试次数（默认: 2）')
+    parser.add_argument('--retry-delay', type=float, default=10, help='重试前的等待秒数，按尝试次数递增（默认: 10）')
+    parser.add_argument('--bbdown', default=os.getenv('BBDOWN', 'BBDown'),
+                        help='BBDown 可执行文件路径，也可以是 .py 脚本（默认: 环境变量 BBDOWN 或 BBDown）')
+    parser.add_argument('--failed-file', help='将最终失败的链接写入此文件，便于再次运行')
+    parser.add_argument('--no-resolve', action='store_true', help='不展开 b23.tv 短链接，也不按 BV 号去重')
+    parser.add_argument('--resolve-cache', default=DEFAULT_CACHE_FILE, help=f'短链接解析缓存文件（默认: {DEFAULT_CACHE_FILE}）')
+
+    if '--' in argv:
+        split = argv.index('--')
+        argv, bbdown_args = argv[:split], argv[split + 1:]
+    else:
+        bbdown_args = []
+    args = parser.parse_args(argv)
+    args.jobs = max(1, args.jobs)
+    args.bbdown_args = bbdown_args
+    return args
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    urls = EXTRACTORS[args.source](args.file_path)
+    if urls and not args.no_resolve:
+        # 下载前先并发展开短链接并按 BV 号去重
+        found = len(urls)
+        urls = resolve_urls(urls, args.resolve_cache)
+        print(f"解析短链接完成：{found} 个链接去重后剩余 {len(urls)} 个")
+    if not urls:
+        print("未找到任何链接。")
+        sys.exit(1)
+
+    print(f"共 {len(urls)} 个链接，最大并发 {args.jobs}")
+    start = time.monotonic()
+    results = asyncio.run(run_batch(urls, args))
+    print_summary(results, time.monotonic() - start, args.failed_file)
+    sys.exit(0 if all(success for _, success, _ in results) else 1)
@@ -0,0 +1,46 @@
+CHUNK_SIZE = 1024 * 1024  # 每次读取的字符数
+MAX_CARRY = 64 * 1024  # 没有空白字符时最多保留到下一块的字符数
+WHITESPACE = (' ', '\n', '\r', '\t')
+
+def iter_matches(file_path, pattern, chunk_size=CHUNK_SIZE, cut_before=None):
+    """分块读取文件并逐个产出去重后的匹配结果，内存占用与文件大小无关
+
+    链接中不含空白字符，因此每块只处理到最后一个空白字符为止，其后的内容
+    与下一块拼接后再匹配，跨块的链接不会被截断。匹配内容可能含空白时（如 HTML
+    标签）传入 cut_before（如 '<'）：每块处理到该字符串最后一次出现之前，要求匹配
+    中只在开头出现该字符串。与 re.findall 相同，pattern 有一个分组时产出该分组。
+    """
+    seen = set()
+    carry = ''
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            buffer = carry + chunk
+            if not buffer:
+                return
+            if not chunk:
+                cut = len(buffer)
+            elif cut_before:
+                cut = max(buffer.rfind(cut_before), 0)
+            else:
+                cut = max(buffer.rfind(char) for char in WHITESPACE) + 1
+            if cut > 0:
+                matches = pattern.findall(buffer, 0, cut)
+            else:
+                # 整块都没有空白字符：保留末尾一段，并排除恰好匹配到处理范围末尾（可能未结束）的链接
+                cut = max(0, len(buffer) - MAX_CARRY)
+                matches = []
+                for match in pattern.finditer(buffer, 0, cut):
+                    if match.end() == cut:
+                        cut = match.start()
+                        break
+                    matches.append(match.group(1) if pattern.groups == 1 else match.group(0))
+
+            # 先在块内去重（dict 保持顺序），再过滤掉之前已经产出过的
+            fresh = [value for value in dict.fromkeys(matches) if value not in seen]
+            seen.update(fresh)
+            yield from fresh
+
+            if not chunk:
+                return
+            carry = buffer[cut:]
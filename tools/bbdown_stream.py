@@ -0,0 +1,154 @@
+"""
+BBDown 流式运行 - 逐行解析 BBDown 输出
+
+边运行边解析 aid、标题、进度和速度，以事件的形式回调；进度长时间没有推进时
+提前结束进程，不必等到整体超时。
+"""
+
+import re
+import time
+import codecs
+import locale
+import queue
+import threading
+import subprocess
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+AID_PATTERN = re.compile(r"获取aid结束: (\d+)")
+TITLE_PATTERN = re.compile(r"视频标题: (.+)")
+PROGRESS_PATTERN = re.compile(r"(\d{1,3}(?:\.\d+)?)%")
+SPEED_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*([KMG]?i?B)/s", re.IGNORECASE)
+LINE_SPLIT_PATTERN = re.compile(r'[\r\n]+')
+
+SPEED_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3,
+               'KIB': 1024, 'MIB': 1024 ** 2, 'GIB': 1024 ** 3}
+
+DEFAULT_STALL_TIMEOUT = 300  # 这么长时间没有任何进展即视为卡住，单位：秒
+DEFAULT_TIMEOUT = 3600  # 整体超时，单位：秒
+OUTPUT_TAIL_LINES = 50  # 保留最后多少行输出，失败时用于排查
+
+@dataclass
+class BBDownEvent:
+    """type: aid / title / progress / line / stalled / timeout"""
+    type: str
+    line: str = ''
+    aid: Optional[str] = None
+    title: Optional[str] = None
+    percent: Optional[float] = None
+    speed: Optional[float] = None  # 字节/秒
+
+@dataclass
+class BBDownResult:
+    returncode: Optional[int] = None
+    aid: Optional[str] = None
+    title: Optional[str] = None
+    stalled: bool = False
+    timed_out: bool = False
+    output: List[str] = field(default_factory=list)  # 最后若干行输出
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.stalled and not self.timed_out
+
+def parse_line(line: str) -> BBDownEvent:
+    """把一行输出解析成事件"""
+    match = AID_PATTERN.search(line)
+    if match:
+        return BBDownEvent('aid', line, aid=match.group(1))
+    match = TITLE_PATTERN.search(line)
+    if match:
+        return BBDownEvent('title', line, title=match.group(1).strip())
+    match = PROGRESS_PATTERN.search(line)
+    if match:
+        speed = SPEED_PATTERN.search(line)
+        return BBDownEvent(
+            'progress', line, percent=float(match.group(1)),
+            speed=float(speed.group(1)) * SPEED_UNITS.get(speed.group(2).upper(), 1) if speed else None
+        )
+    return BBDownEvent('line', line)
+
+def _read_lines(stream, lines: queue.Queue):
+    # 进度条用 \r 原地刷新，按 \r 和 \n 切分
+    # 与 subprocess 的 text=True 一样按本地编码解码；增量解码，多字节字符被分块截断时等下一块再解码
+    decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors='replace')
+    pending = ''
+    while True:
+        chunk = stream.read1(4096)
+        parts = LINE_SPLIT_PATTERN.split(pending + decoder.decode(chunk, final=not chunk))
+        pending = parts.pop()
+        for part in parts:
+            if part.strip():
+                lines.put(part)
+        if not chunk:
+            break
+    if pending.strip():
+        lines.put(pending)
+    lines.put(None)
+
+def run_bbdown(command: List[str], cwd: Optional[str] = None,
+               on_event: Optional[Callable[[BBDownEvent], None]] = None,
+               stall_timeout: float = DEFAULT_STALL_TIMEOUT,
+               timeout: float = DEFAULT_TIMEOUT) -> BBDownResult:
+    """运行 BBDown 并实时解析输出
+
+    进度百分比变化、速度大于0或出现普通输出行都算作有进展；超过 stall_timeout
+    秒没有进展，或总时长超过 timeout，结束进程。无法启动 BBDown（如可执行文件
+    不存在）时返回失败的结果，错误信息在 output 中。
+    """
+    result = BBDownResult()
+    tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    try:
+        process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    except OSError as e:
+        result.output = [f"无法启动BBDown: {e}"]
+        return result
+    lines = queue.Queue()
+    reader = threading.Thread(target=_read_lines, args=(process.stdout, lines), daemon=True)
+    reader.start()
+
+    start = last_progress = time.monotonic()
+    last_percent = None
+
+    def emit(event):
+        if on_event:
+            on_event(event)
+
+    while True:
+        try:
+            line = lines.get(timeout=1)
+        except queue.Empty:
+            pass
+        else:
+            if line is None:
+                break
+            tail.append(line)
+            event = parse_line(line)
+            if event.type == 'aid':
+                result.aid = event.aid
+            elif event.type == 'title':
+                result.title = event.title
+            # 视频、音频分别从0%开始下载，百分比有变化即算有进展
+            if event.type != 'progress' or event.percent != last_percent or (event.speed or 0) > 0:
+                last_progress = time.monotonic()
+            if event.type == 'progress':
+                last_percent = event.percent
+            emit(event)
+
+        now = time.monotonic()
+        if now - last_progress > stall_timeout:
+            result.stalled = True
+            emit(BBDownEvent('stalled', f"{stall_timeout:.0f}秒内没有进展，结束进程"))
+            process.kill()
+            break
+        if now - start > timeout:
+            result.timed_out = True
+            emit(BBDownEvent('timeout', f"超过{timeout:.0f}秒，结束进程"))
+            process.kill()
+            break
+
+    result.returncode = process.wait()
+    reader.join(timeout=5)
+    result.output = list(tail)
+    return result
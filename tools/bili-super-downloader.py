@@ -22,14 +22,17 @@ import random
 import argparse
 import traceback
 import json
+import math
+import re
+import sqlite3
+import shutil
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional, Union, Any
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, asdict, fields
 from hashlib import md5
-from functools import reduce
 import concurrent.futures
-import subprocess
 # 简化版本：移除不必要的导入
 
 # 第三方库导入
@@ -44,6 +47,12 @@ except ImportError as e:
     print("请运行: pip install pyyaml pandas requests send2trash")
     sys.exit(1)
 
+# 同目录下的共享下载归档
+from download_archive import DownloadArchive, DEFAULT_ARCHIVE_FILE, TEMP_FILE_SUFFIXES
+from bbdown_stream import run_bbdown, BBDownResult
+import job_journal
+from job_journal import JobJournal, DEFAULT_JOURNAL_FILE
+
 # 忽略SSL警告
 requests.packages.urllib3.disable_warnings(requests.packages.urllib3.exceptions.InsecureRequestWarning)
 
@@ -337,12 +346,25 @@ class BiliConfig:
             },
             'time': {
                 'start_date': '',
-                'batch_time_range': '7'
+                'batch_time_range': '7',
+                'incremental': False
             },
             'download': {
                 'enabled': True,
                 'check_downloaded': True,
+                'persist_index': False,
+                'use_archive': True,
+                'archive_file': '',
+                'use_journal': True,
+                'journal_file': '',
+                'max_attempts': 3,
+                'min_free_gb': 0,
+                'default_bitrate': 3000,
+                'reclaim_uploaded': 'keep',
                 'max_workers': 1,
+                'per_up_limit': 1,
+                'stall_timeout': 300,
+                'timeout': 3600,
                 'clean_subfolders': True,
                 'clean_temp_files': True
             },
@@ -351,6 +373,10 @@ class BiliConfig:
                 'delay': 0.5,
                 'max_pages': 100,
                 'page_size': 50,
+                'page_workers': 4,
+                'scan_workers': 4,
+                'wbi_cache_file': '~/.cache/bili_wbi_keys.json',
+                'wbi_cache_ttl': 21600,
                 'timeout': 10,
                 'verify_ssl': False
             },
@@ -441,14 +467,19 @@ class BiliConfig:
         
         if mode == 'batch':
             # 批量模式配置 - 字典格式
+            # 值可以是UP主ID，也可以是 {mid: ID, priority: 优先级}
             batch_dict = self.get('uploader.batch_list', {})
-            for name, mid in batch_dict.items():
+            for name, value in batch_dict.items():
+                if isinstance(value, dict):
+                    mid, priority = value.get('mid'), int(value.get('priority', 1))
+                else:
+                    mid, priority = value, 1
                 if name and mid:
                     up_info = UpInfo(
                         name=name,  # 文件夹: Bili-{name}
                         mid=str(mid),
                         enabled=True,
-                        priority=1
+                        priority=priority
                     )
                     up_list.append(up_info)
         
@@ -469,6 +500,38 @@ class BiliConfig:
 # 网络管理器 (Network Manager)
 # =============================================================================
 
+# WBI混合密钥的字符重排表
+MIXIN_KEY_ENC_TAB = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3,
+    45, 35, 27, 43, 5, 49, 33, 9, 42, 19, 29, 28, 14, 39,
+    12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40, 61, 26, 17,
+    0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63,
+    57, 62, 11, 36, 20, 34, 44, 52
+]
+
+# WBI签名失效时API返回的错误码，需要刷新密钥
+WBI_SIGN_ERROR_CODES = (-352, -403)
+
+# 默认WBI密钥缓存文件 (与bup-scan-xlsx-bbdown.py共用)
+DEFAULT_WBI_CACHE_FILE = '~/.cache/bili_wbi_keys.json'
+
+class RateLimiter:
+    """请求速率限制器 - 多线程共享，保证相邻请求的发出间隔不小于 1/rate 秒"""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+    
+    def acquire(self):
+        """等待直到允许发出下一个请求"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
 class NetworkManager:
     """网络请求管理器 - 封装WBI签名和API请求"""
     
@@ -478,6 +541,26 @@ class NetworkManager:
         self.session = requests.Session()
         self.session.verify = config.get('network.verify_ssl', False)
         
+        # 连接池大小与并发抓取线程数匹配，避免并发请求时丢弃连接
+        pool_size = max(10, int(config.get('network.page_workers', 4)))
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # 全局请求速率：未配置时按 delay 换算，保持原有的请求间隔
+        rate = config.get('network.requests_per_second')
+        if not rate:
+            delay = config.get('network.delay', 0.5)
+            rate = 1.0 / delay if delay else 0
+        self.rate_limiter = RateLimiter(rate)
+        
+        # WBI密钥缓存：内存 + 磁盘(带TTL)，多次运行及多个进程共享
+        self.wbi_cache_file = Path(config.get('network.wbi_cache_file', DEFAULT_WBI_CACHE_FILE)).expanduser()
+        self.wbi_cache_ttl = config.get('network.wbi_cache_ttl', 6 * 3600)
+        self._wbi_cache = None
+        self._wbi_lock = threading.Lock()
+        self._mixin_key_cache = {}
+        
         # 设置默认请求头
         self.session.headers.update({
             'User-Agent': self._get_user_agent(),
@@ -493,32 +576,83 @@ class NetworkManager:
         else:
             return 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36'
     
-    def get_wbi_keys(self) -> tuple:
-        """获取WBI签名密钥"""
+    def _fetch_wbi_keys_from_api(self) -> tuple:
+        """从nav接口获取WBI签名密钥"""
+        resp = self.session.get(
+            'https://api.bilibili.com/x/web-interface/nav',
+            timeout=self.config.get('network.timeout', 10)
+        )
+        resp.raise_for_status()
+        data = resp.json()['data']['wbi_img']
+        img_key = data['img_url'].rsplit('/', 1)[1].split('.')[0]
+        sub_key = data['sub_url'].rsplit('/', 1)[1].split('.')[0]
+        return img_key, sub_key
+    
+    def _load_wbi_cache(self) -> Optional[Dict[str, Any]]:
+        """读取磁盘上的WBI密钥缓存，过期或损坏时返回None"""
         try:
-            resp = self.session.get(
-                'https://api.bilibili.com/x/web-interface/nav',
-                timeout=self.config.get('network.timeout', 10)
-            )
-            resp.raise_for_status()
-            data = resp.json()['data']['wbi_img']
-            img_key = data['img_url'].rsplit('/', 1)[1].split('.')[0]
-            sub_key = data['sub_url'].rsplit('/', 1)[1].split('.')[0]
+            with open(self.wbi_cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if time.time() - cache.get('fetched_at', 0) < self.wbi_cache_ttl \
+                    and cache.get('img_key') and cache.get('sub_key'):
+                return cache
+        except (OSError, ValueError):
+            pass
+        return None
+    
+    def _save_wbi_cache(self, cache: Dict[str, Any]):
+        """写入WBI密钥缓存（先写临时文件再替换，多进程同时写入也不会损坏）"""
+        try:
+            self.wbi_cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.wbi_cache_file.with_name(f"{self.wbi_cache_file.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.wbi_cache_file)
+        except OSError as e:
+            logging.warning(f"保存WBI密钥缓存失败: {e}")
+    
+    def get_wbi_keys(self, force_refresh: bool = False) -> tuple:
+        """获取WBI签名密钥 - 依次使用内存缓存、磁盘缓存(带TTL)、nav接口"""
+        with self._wbi_lock:
+            if not force_refresh:
+                cache = self._wbi_cache
+                if not cache or time.time() - cache['fetched_at'] >= self.wbi_cache_ttl:
+                    cache = self._load_wbi_cache()
+                if cache:
+                    self._wbi_cache = cache
+                    return cache['img_key'], cache['sub_key']
+            
+            try:
+                img_key, sub_key = self._fetch_wbi_keys_from_api()
+            except Exception as e:
+                logging.error(f"获取WBI密钥失败: {e}")
+                return None, None
+            
+            self._wbi_cache = {
+                'img_key': img_key,
+                'sub_key': sub_key,
+                'fetched_at': time.time()
+            }
+            self._save_wbi_cache(self._wbi_cache)
+            logging.info("WBI密钥已更新")
             return img_key, sub_key
-        except Exception as e:
-            logging.error(f"获取WBI密钥失败: {e}")
-            return None, None
+    
+    def refresh_wbi_keys(self, stale_img_key: str) -> tuple:
+        """签名失效时刷新密钥；若其他线程已刷新过则直接使用新密钥，避免重复请求nav接口"""
+        with self._wbi_lock:
+            cache = self._wbi_cache
+            if cache and cache['img_key'] != stale_img_key:
+                return cache['img_key'], cache['sub_key']
+        logging.warning("WBI签名失效，刷新密钥")
+        return self.get_wbi_keys(force_refresh=True)
     
     def get_mixin_key(self, orig: str) -> str:
-        """混合WBI密钥"""
-        MIXIN_KEY_ENC_TAB = [
-            46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3,
-            45, 35, 27, 43, 5, 49, 33, 9, 42, 19, 29, 28, 14, 39,
-            12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40, 61, 26, 17,
-            0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63,
-            57, 62, 11, 36, 20, 34, 44, 52
-        ]
-        return reduce(lambda s, i: s + orig[i], MIXIN_KEY_ENC_TAB, '')[:32]
+        """混合WBI密钥（同一组密钥只计算一次）"""
+        mixin_key = self._mixin_key_cache.get(orig)
+        if mixin_key is None:
+            mixin_key = ''.join(orig[i] for i in MIXIN_KEY_ENC_TAB)[:32]
+            self._mixin_key_cache[orig] = mixin_key
+        return mixin_key
     
     def enc_wbi(self, params: dict, img_key: str, sub_key: str) -> dict:
         """WBI签名"""
@@ -537,10 +671,10 @@ class NetworkManager:
         """带重试机制的请求"""
         for attempt in range(max_retries):
             try:
-                delay = self.config.get('network.delay', 0.5)
                 if attempt > 0:
-                    delay *= (attempt + 1)  # 指数退避
-                time.sleep(delay)
+                    # 重试前退避，正常请求的间隔由速率限制器统一控制
+                    time.sleep(self.config.get('network.delay', 0.5) * (attempt + 1))
+                self.rate_limiter.acquire()
                 
                 response = self.session.get(
                     url, 
@@ -571,18 +705,23 @@ class DataManager:
         self.primary_format = config.get('data.format', 'excel')
         # 备份格式暂时移除，保持简化
         
+        # 多个UP主并发扫描时都会保存数据；Excel/JSON/CSV 是先读后写同一个文件，
+        # 同时保存会互相覆盖，因此串行执行
+        self._save_lock = threading.Lock()
+        
     def save_videos(self, videos: List[VideoInfo], up_info = None, up_name: str = "default") -> bool:
         """保存视频数据 - 支持按UP主分表"""
         try:
             # 转换为字典格式
             video_data = [video.to_dict() for video in videos]
             
-            # 如果提供了UP主信息且开启分表，使用UP主信息
-            if up_info and self.config.get('data.split_by_uploader', False):
-                success = self._save_primary_format(video_data, up_info.name, up_info.mid)
-            else:
-                # 兼容原有调用方式
-                success = self._save_primary_format(video_data, up_name)
+            with self._save_lock:
+                # 如果提供了UP主信息且开启分表，使用UP主信息
+                if up_info and self.config.get('data.split_by_uploader', False):
+                    success = self._save_primary_format(video_data, up_info.name, up_info.mid)
+                else:
+                    # 兼容原有调用方式
+                    success = self._save_primary_format(video_data, up_name)
             
             return success
         except Exception as e:
@@ -591,7 +730,9 @@ class DataManager:
     
     def _save_primary_format(self, video_data: List[Dict], up_name: str, up_mid: str = None) -> bool:
         """保存主要格式 - 支持按UP主分表"""
-        if self.primary_format == 'excel':
+        if self.primary_format == 'sqlite':
+            return self._save_sqlite(video_data)
+        elif self.primary_format == 'excel':
             return self._save_excel(video_data, up_name, up_mid)
         elif self.primary_format == 'json':
             return self._save_json(video_data, up_name, up_mid)
@@ -603,6 +744,84 @@ class DataManager:
     
     # 简化版本：移除备份格式功能
     
+    def _get_db_path(self) -> Path:
+        """SQLite数据库路径"""
+        return Path(self.config.get('data.db_file', self.data_dir / 'bilibili_videos.db'))
+    
+    def _connect_db(self) -> sqlite3.Connection:
+        """打开SQLite数据库，按VideoInfo字段建表（bvid为主键）"""
+        db_path = self._get_db_path()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path), timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        columns = ', '.join(
+            'bvid TEXT PRIMARY KEY' if f.name == 'bvid' else f.name
+            for f in fields(VideoInfo)
+        )
+        conn.execute(f'CREATE TABLE IF NOT EXISTS videos ({columns})')
+        return conn
+    
+    def _save_sqlite(self, video_data: List[Dict]) -> bool:
+        """保存到SQLite - 按bvid增量upsert，单个事务提交，耗时与历史数据量无关"""
+        try:
+            columns = [f.name for f in fields(VideoInfo)]
+            rows = [
+                tuple(
+                    json.dumps(video.get(col), ensure_ascii=False)
+                    if isinstance(video.get(col), (list, dict)) else video.get(col)
+                    for col in columns
+                )
+                for video in video_data
+            ]
+            updates = ', '.join(f'{col}=excluded.{col}' for col in columns if col != 'bvid')
+            sql = (f"INSERT INTO videos ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                   f"ON CONFLICT(bvid) DO UPDATE SET {updates}")
+            
+            conn = self._connect_db()
+            try:
+                with conn:
+                    conn.executemany(sql, rows)
+            finally:
+                conn.close()
+            logging.info(f"SQLite数据已保存: {self._get_db_path()} ({len(rows)} 条)")
+            return True
+            
+        except Exception as e:
+            logging.error(f"保存SQLite数据失败: {e}")
+            return False
+    
+    def export(self, format_type: str, output_path: Optional[str] = None, mid: Optional[str] = None) -> Optional[Path]:
+        """从SQLite按需导出Excel/CSV"""
+        try:
+            conn = self._connect_db()
+            try:
+                if mid:
+                    df = pd.read_sql_query('SELECT * FROM videos WHERE mid = ? ORDER BY created DESC', conn, params=(mid,))
+                else:
+                    df = pd.read_sql_query('SELECT * FROM videos ORDER BY created DESC', conn)
+            finally:
+                conn.close()
+            
+            if output_path:
+                file_path = Path(output_path)
+            else:
+                suffix = 'xlsx' if format_type == 'excel' else format_type
+                name = f"bilibili_videos_{mid}" if mid else "bilibili_videos"
+                file_path = self.data_dir / f"{name}_{datetime.now().strftime('%Y%m%d')}.{suffix}"
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            if format_type == 'excel':
+                sheet_name = self.config.get('data.sheet_name', 'Videos')
+                df.to_excel(file_path, sheet_name=sheet_name, index=self.config.get('data.include_index', False))
+            else:
+                df.to_csv(file_path, index=False, encoding='utf-8-sig')
+            logging.info(f"已导出 {len(df)} 条视频数据: {file_path}")
+            return file_path
+            
+        except Exception as e:
+            logging.error(f"导出数据失败: {e}")
+            return None
+    
     def _save_excel(self, video_data: List[Dict], up_name: str, up_mid: str = None, is_backup: bool = False) -> bool:
         """保存Excel格式"""
         try:
@@ -741,10 +960,344 @@ class DataManager:
         else:
             return self.data_dir / filename
 
+class ScanStateStore:
+    """增量扫描状态 - 记录每个UP主已处理的最新视频(高水位)，下次扫描遇到即停止"""
+    
+    def __init__(self, state_file: Path):
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {}
+        if state_file.exists():
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    self._state = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"读取增量扫描状态失败，将完整扫描: {e}")
+    
+    def get(self, mid: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._state.get(mid)
+    
+    def update(self, mid: str, created: int, bvid: str):
+        """更新UP主的高水位并立即写盘（先写临时文件再替换）"""
+        with self._lock:
+            current = self._state.get(mid)
+            if current and current.get('created', 0) > created:
+                return
+            self._state[mid] = {
+                'created': created,
+                'bvid': bvid,
+                'updated': datetime.now().isoformat()
+            }
+            try:
+                self.state_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.state_file.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._state, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.state_file)
+            except OSError as e:
+                logging.warning(f"保存增量扫描状态失败: {e}")
+
 # =============================================================================
 # 下载管理器 (Download Manager)
 # =============================================================================
 
+# 文件名中的BV号
+BVID_PATTERN = re.compile(r'BV[0-9A-Za-z]{10}')
+
+# BBDown 混流后可能的输出格式，下载完成后按标题直接查找文件
+OUTPUT_FILE_SUFFIXES = ('.mp4', '.mkv', '.flv')
+
+class DownloadIndex:
+    """下载目录索引 - 每个目录只用一次scandir建立 BVID→文件名 映射，之后O(1)查询"""
+    
+    def __init__(self, index_dir: Optional[Path] = None):
+        # index_dir 不为空时把索引持久化到该目录，目录修改时间未变化则直接复用
+        self.index_dir = index_dir
+        self._folders: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+    
+    def _index_file(self, folder: Path) -> Path:
+        return self.index_dir / f"{folder.name}.json"
+    
+    def _scan(self, folder: Path) -> Dict[str, str]:
+        """扫描目录，收集文件名中包含BV号、非临时且非空的文件"""
+        index = {}
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.endswith(TEMP_FILE_SUFFIXES):
+                    continue
+                bvids = BVID_PATTERN.findall(entry.name)
+                if bvids and entry.stat().st_size > 0:
+                    for bvid in bvids:
+                        index[bvid] = entry.name
+        return index
+    
+    def _load(self, folder: Path) -> Optional[Dict[str, str]]:
+        """读取持久化索引，目录修改时间不一致时视为失效"""
+        try:
+            with open(self._index_file(folder), 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('mtime') == os.stat(folder).st_mtime_ns:
+                return saved.get('files', {})
+        except (OSError, ValueError):
+            pass
+        return None
+    
+    def _save(self, folder: Path, index: Dict[str, str]):
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            index_file = self._index_file(folder)
+            tmp_path = index_file.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'mtime': os.stat(folder).st_mtime_ns, 'files': index}, f, ensure_ascii=False)
+            os.replace(tmp_path, index_file)
+        except OSError as e:
+            logging.warning(f"保存下载索引失败: {folder}, 错误: {e}")
+    
+    def _get(self, folder: Path) -> Dict[str, str]:
+        key = str(folder)
+        index = self._folders.get(key)
+        if index is None:
+            index = self._load(folder) if self.index_dir else None
+            if index is None:
+                index = self._scan(folder)
+                if self.index_dir:
+                    self._save(folder, index)
+                logging.debug(f"已建立下载索引: {folder} ({len(index)} 个视频)")
+            self._folders[key] = index
+        return index
+    
+    def contains(self, folder: Path, bvid: str) -> bool:
+        with self._lock:
+            return bvid in self._get(folder)
+    
+    def get(self, folder: Path, bvid: str) -> Optional[str]:
+        """返回目录中包含该BV号的文件名，没有时返回None"""
+        with self._lock:
+            return self._get(folder).get(bvid)
+    
+    def find_new(self, folder: Path, bvid: str, since: float, title: Optional[str] = None) -> Optional[str]:
+        """下载完成后查找新文件，不重建整个目录的索引
+        
+        先按BBDown输出的标题直接查找；找不到时遍历一次目录，取文件名包含BV号的文件，
+        或修改时间不早于下载开始、还没有记录在索引中的最新文件。
+        """
+        if title:
+            for suffix in OUTPUT_FILE_SUFFIXES:
+                try:
+                    if (folder / f"{title}{suffix}").stat().st_size > 0:
+                        return f"{title}{suffix}"
+                except (OSError, ValueError):
+                    pass
+        with self._lock:
+            known = set(self._get(folder).values())
+        newest, newest_mtime = None, since
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.endswith(TEMP_FILE_SUFFIXES):
+                    continue
+                stat = entry.stat()
+                if stat.st_size == 0:
+                    continue
+                if bvid in entry.name:
+                    return entry.name
+                if entry.name not in known and stat.st_mtime >= newest_mtime:
+                    newest, newest_mtime = entry.name, stat.st_mtime
+        return newest
+    
+    def add(self, folder: Path, bvid: str, file_name: str = ''):
+        """下载完成后增量更新索引"""
+        with self._lock:
+            index = self._get(folder)
+            index[bvid] = file_name
+            if self.index_dir:
+                self._save(folder, index)
+
+def parse_length(length: str) -> int:
+    """把 "MM:SS" 或 "HH:MM:SS" 格式的时长转换为秒数，无法解析时返回0"""
+    seconds = 0
+    try:
+        for part in str(length).split(':'):
+            seconds = seconds * 60 + int(part)
+    except ValueError:
+        return 0
+    return seconds
+
+def download_order_key(video: VideoInfo) -> tuple:
+    """同一UP主内的下载顺序：新发布的优先，发布时间相同时短视频（体积小）优先"""
+    created = video.created if isinstance(video.created, int) else 0
+    return (-created, video.duration or parse_length(video.length))
+
+class DownloadScheduler:
+    """跨UP主的全局下载队列
+    
+    所有UP主的下载任务进入同一个队列，空闲的下载线程每次取出：优先级最高、
+    当前下载数和已开始下载数最少的UP主中最新、最短的视频，同优先级的UP主轮流下载。每个UP主同时下载的数量不超过
+    per_up_limit；所有UP主扫描完成（close）后，其他UP主都没有可下载任务时才允许超出，
+    扫描进行中不超出，避免占满下载线程后更高优先级UP主的任务入队却没有线程可用。
+    """
+    
+    def __init__(self, download_manager: 'DownloadManager', max_workers: int, per_up_limit: int):
+        self.download_manager = download_manager
+        self.max_workers = max(1, max_workers)
+        self.per_up_limit = max(1, per_up_limit)
+        self._pending: List[tuple] = []  # (up, video, folder, result)
+        self._active: Dict[str, int] = {}
+        self._started: Dict[str, int] = {}
+        self._closed = False
+        self._condition = threading.Condition()
+        self._workers: List[threading.Thread] = []
+    
+    def start(self):
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._worker, name=f"download-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+    
+    def submit(self, up: UpInfo, video: VideoInfo, folder: Path, result: Dict[str, Any]):
+        with self._condition:
+            self._pending.append((up, video, folder, result))
+            self._condition.notify()
+    
+    def close(self):
+        """不再有新任务（扫描全部完成），等待队列中的任务全部完成"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+    
+    def _job_key(self, job: tuple) -> tuple:
+        up, video = job[0], job[1]
+        return (-up.priority, self._active.get(up.mid, 0), self._started.get(up.mid, 0)) + download_order_key(video)
+    
+    def _take_next(self) -> Optional[tuple]:
+        with self._condition:
+            while True:
+                if self._pending:
+                    eligible = [job for job in self._pending
+                                if self._active.get(job[0].mid, 0) < self.per_up_limit]
+                    # 还有UP主在扫描时不超出名额，等待新任务入队或名额空出
+                    if eligible or self._closed:
+                        job = min(eligible or self._pending, key=self._job_key)
+                        self._pending.remove(job)
+                        self._active[job[0].mid] = self._active.get(job[0].mid, 0) + 1
+                        self._started[job[0].mid] = self._started.get(job[0].mid, 0) + 1
+                        return job
+                elif self._closed:
+                    return None
+                self._condition.wait()
+    
+    def _worker(self):
+        while True:
+            job = self._take_next()
+            if job is None:
+                return
+            up, video, folder, result = job
+            try:
+                success = self.download_manager.download_video(video, folder)
+            except Exception as e:
+                logging.error(f"下载任务异常: {video.title}, 错误: {e}")
+                success = False
+            with self._condition:
+                self._active[up.mid] -= 1
+                result['videos_downloaded' if success else 'videos_failed'] += 1
+                # 该UP主的名额空出后，之前被限制的任务可能可以开始了
+                self._condition.notify_all()
+
+# BBDown 先分别下载视频流和音频流再混流，峰值占用约为成品大小的两倍
+MUX_SPACE_FACTOR = 2
+# 时长未知时按此时长估算，单位：秒
+UNKNOWN_LENGTH = 600
+# 计算码率时参考最近多少个已下载的视频
+BITRATE_HISTORY = 50
+
+class DiskSpaceGuard:
+    """下载准入控制 - 按时长和历史码率估算视频大小，磁盘剩余空间低于水位线时暂缓下载
+    
+    每个开始下载的视频按估算大小预留空间，剩余空间减去所有预留中尚未写入的部分后仍高于水位线才放行，
+    否则等待其他下载完成、外部释放空间或回收已上传的文件。已写入的部分按BBDown的下载进度估算，
+    这部分已经体现在剩余空间里，不再重复扣除。
+    """
+    
+    def __init__(self, folder: Path, min_free_bytes: int, default_bitrate: float,
+                 samples: Optional[List[float]] = None, reclaim=None, poll_interval: float = 30):
+        self.folder = folder
+        self.min_free_bytes = min_free_bytes
+        self.reclaim = reclaim
+        self.poll_interval = poll_interval
+        self._reservations: Dict[str, List[int]] = {}  # BV号 -> [预留字节数, 估计已写入字节数]
+        self._condition = threading.Condition()
+        self._reclaim_lock = threading.Lock()
+        # 码率(字节/秒)：历史样本取中位数作为初始值，之后按新完成的下载指数平滑
+        self.bitrate = sorted(samples)[len(samples) // 2] if samples else default_bitrate
+    
+    def estimate(self, video: VideoInfo) -> int:
+        seconds = video.duration or parse_length(video.length) or UNKNOWN_LENGTH
+        return int(seconds * self.bitrate * MUX_SPACE_FACTOR)
+    
+    def _outstanding(self) -> int:
+        # 所有预留中尚未写入磁盘的部分
+        return sum(need - written for need, written in self._reservations.values())
+    
+    def acquire(self, video: VideoInfo) -> int:
+        """等待空间足够后预留，返回预留的字节数
+        
+        没有其他下载占用预留、也回收不出空间时，单个视频的估算超过可用空间也放行，
+        否则会一直等待下去；剩余空间已低于水位线时仍等待外部释放空间。
+        """
+        need = self.estimate(video)
+        last_warning = 0.0
+        nothing_to_reclaim = self.reclaim is None
+        while True:
+            with self._condition:
+                free = shutil.disk_usage(self.folder).free
+                outstanding = self._outstanding()
+                if free - outstanding - need >= self.min_free_bytes:
+                    self._reservations[video.bvid] = [need, 0]
+                    return need
+                if nothing_to_reclaim:
+                    if not self._reservations and free >= self.min_free_bytes:
+                        logging.warning(
+                            f"预计需要的空间超过可用空间，没有其他下载可等待，仍然开始下载: {video.title} "
+                            f"(剩余 {free / 1024 ** 3:.1f}GB，预计需要 {need / 1024 ** 3:.1f}GB，"
+                            f"水位线 {self.min_free_bytes / 1024 ** 3:.1f}GB)"
+                        )
+                        self._reservations[video.bvid] = [need, 0]
+                        return need
+                    if time.monotonic() - last_warning > 600:
+                        last_warning = time.monotonic()
+                        logging.warning(
+                            f"磁盘剩余空间不足，暂缓下载: {video.title} (剩余 {free / 1024 ** 3:.1f}GB，"
+                            f"已预留 {outstanding / 1024 ** 3:.1f}GB，预计需要 {need / 1024 ** 3:.1f}GB，"
+                            f"水位线 {self.min_free_bytes / 1024 ** 3:.1f}GB)"
+                        )
+                    self._condition.wait(self.poll_interval)
+                    nothing_to_reclaim = self.reclaim is None
+                    continue
+            # 回收在锁外进行，回收期间其他下载仍可释放预留；多个等待的下载依次回收
+            with self._reclaim_lock:
+                nothing_to_reclaim = self.reclaim() <= 0
+    
+    def progress(self, video: VideoInfo, percent: float):
+        """按BBDown的下载进度更新已写入的部分；音视频流各自从0%开始，只取最大值"""
+        with self._condition:
+            reservation = self._reservations.get(video.bvid)
+            if reservation:
+                # 预留中包含混流的空间，下载完成时只写入了成品大小
+                written = int(reservation[0] / MUX_SPACE_FACTOR * min(percent, 100) / 100)
+                reservation[1] = max(reservation[1], written)
+    
+    def release(self, need: int, video: VideoInfo, path: Optional[str] = None):
+        """下载结束后释放预留；下载成功时用实际文件大小更新码率"""
+        seconds = video.duration or parse_length(video.length)
+        with self._condition:
+            self._reservations.pop(video.bvid, None)
+            if path and seconds and os.path.isfile(path):
+                self.bitrate = self.bitrate * 0.8 + os.path.getsize(path) / seconds * 0.2
+            self._condition.notify_all()
+
 class DownloadManager:
     """下载管理器 - 处理视频下载逻辑"""
     
@@ -757,6 +1310,76 @@ class DownloadManager:
         self.check_downloaded = config.get('download.check_downloaded', True)
         self.use_date_folder = False  # 简化：不使用日期文件夹
         
+        # 已下载视频索引，可选持久化到 base.download_dir/.bvid-index
+        index_dir = self.base_dir / '.bvid-index' if config.get('download.persist_index', False) else None
+        self.index = DownloadIndex(index_dir)
+        
+        # 共享下载归档：按BV号记录，文件改名或移动到其他UP主目录后仍能识别为已下载
+        self.archive = None
+        if config.get('download.use_archive', True):
+            self.archive = DownloadArchive(config.get('download.archive_file') or DEFAULT_ARCHIVE_FILE)
+        
+        # 任务日志：记录每个视频的下载状态和尝试次数，中断后重新运行时恢复未完成的任务
+        self.journal = None
+        self.max_attempts = int(config.get('download.max_attempts', 3))
+        if config.get('download.use_journal', True):
+            self.journal = JobJournal(config.get('download.journal_file') or DEFAULT_JOURNAL_FILE)
+        
+        # 已上传文件的回收策略：keep 保留，trash 移到回收站，delete 直接删除
+        self.reclaim_policy = config.get('download.reclaim_uploaded', 'keep')
+        if self.reclaim_policy not in ('keep', 'trash', 'delete'):
+            logging.warning(f"未知的回收策略: {self.reclaim_policy}，保留已上传的文件")
+            self.reclaim_policy = 'keep'
+        
+        # 磁盘空间准入控制：剩余空间低于 min_free_gb 时暂缓新的下载
+        self.space_guard = None
+        min_free_gb = float(config.get('download.min_free_gb', 0))
+        if min_free_gb > 0:
+            self.space_guard = DiskSpaceGuard(
+                self.base_dir, int(min_free_gb * 1024 ** 3),
+                default_bitrate=float(config.get('download.default_bitrate', 3000)) * 1000 / 8,
+                samples=self._bitrate_samples(),
+                reclaim=self.reclaim_uploaded if self.reclaim_policy != 'keep' else None
+            )
+        
+    def _bitrate_samples(self) -> List[float]:
+        """从任务日志中最近下载的视频计算码率样本（字节/秒）"""
+        if not self.journal:
+            return []
+        samples = []
+        for state in job_journal.DONE_STATES:
+            for job in self.journal.by_state('bilibili', state, limit=BITRATE_HISTORY):
+                seconds = parse_length(job['info'].get('length', ''))
+                path = job['path']
+                if seconds and path and os.path.isfile(path):
+                    samples.append(os.path.getsize(path) / seconds)
+        return samples
+    
+    def reclaim_uploaded(self) -> int:
+        """按回收策略处理任务日志中已上传、本地文件仍在的视频，返回释放的字节数
+        
+        trash 移到回收站，回收站与下载目录在同一磁盘时并不释放空间，只有 delete 会计入释放量。
+        文件删除后下载归档和任务日志仍有记录，不会重复下载。
+        """
+        if not self.journal or self.reclaim_policy == 'keep':
+            return 0
+        freed = 0
+        for job in self.journal.by_state('bilibili', job_journal.UPLOADED):
+            path = job['path']
+            if not path or not os.path.isfile(path):
+                continue
+            try:
+                size = os.path.getsize(path)
+                if self.reclaim_policy == 'trash':
+                    send2trash(path)
+                else:
+                    os.remove(path)
+                    freed += size
+                logging.info(f"回收已上传的文件: {path} ({size / 1024 ** 2:.0f}MB)")
+            except OSError as e:
+                logging.warning(f"回收文件失败: {path}, 错误: {e}")
+        return freed
+    
     def get_up_folder(self, up: UpInfo) -> Path:
         """获取UP主的下载文件夹路径"""
         folder_name = up.get_folder_name(self.use_date_folder)
@@ -810,56 +1433,115 @@ class DownloadManager:
             logging.error(f"清理文件夹失败: {folder}, 错误: {e}")
     
     def is_video_downloaded(self, folder: Path, bvid: str) -> bool:
-        """检查视频是否已下载"""
+        """检查视频是否已下载（先查下载归档和任务日志，再查目录索引）"""
         if not self.check_downloaded:
             return False
             
         try:
-            for file_path in folder.iterdir():
-                if file_path.is_file() and bvid in file_path.name:
-                    # 排除临时文件
-                    if not file_path.suffix in ['.download', '.part', '.tmp', '.temp']:
-                        # 检查文件大小
-                        if file_path.stat().st_size > 0:
-                            return True
-            return False
+            if self.archive and self.archive.contains('bilibili', bvid):
+                return True
+            if self.journal:
+                job = self.journal.get('bilibili', bvid)
+                if job and job['state'] in job_journal.DONE_STATES:
+                    return True
+            file_name = self.index.get(folder, bvid)
+            if file_name is None:
+                return False
+            if self.archive:
+                # 归档之前下载的文件，补录进归档
+                self.archive.add('bilibili', bvid, str(folder / file_name), with_hash=False)
+            return True
         except Exception as e:
             logging.error(f"检查下载状态失败: {e}")
             return False
     
+    def _record_download(self, folder: Path, bvid: str, started: float,
+                         title: Optional[str] = None) -> Optional[str]:
+        """更新目录索引、下载归档和任务日志，返回下载的文件路径（未找到时为目录）"""
+        if not self.archive and not self.journal and not self.space_guard:
+            self.index.add(folder, bvid)
+            return None
+        # 按BBDown输出的标题或下载开始后新出现的文件找到实际文件，增量加入索引（找不到时只记录目录）
+        file_name = self.index.find_new(folder, bvid, started, title)
+        self.index.add(folder, bvid, file_name or '')
+        path = str(folder / file_name) if file_name else str(folder)
+        if self.archive:
+            self.archive.add('bilibili', bvid, path)
+        if self.journal:
+            self.journal.set_state('bilibili', bvid, job_journal.DOWNLOADED, path=path)
+        return path
+    
+    def journal_discovered(self, up: UpInfo, videos: List[VideoInfo], folder: Path) -> int:
+        """把扫描到的视频登记到任务日志，返回新增任务数"""
+        if not self.journal or not videos:
+            return 0
+        return self.journal.discover('bilibili', (
+            {
+                'video_id': v.bvid,
+                'owner': up.mid,
+                'folder': str(folder),
+                'info': {'aid': v.aid, 'title': v.title, 'created': v.created, 'length': v.length}
+            }
+            for v in videos
+        ))
+    
+    def unfinished_videos(self, up: UpInfo) -> List[VideoInfo]:
+        """任务日志中该UP主未完成的视频（上次中断、失败未达到最大尝试次数）"""
+        if not self.journal:
+            return []
+        return [
+            VideoInfo(bvid=job['video_id'], mid=up.mid, author=up.name, **job['info'])
+            for job in self.journal.unfinished('bilibili', owner=up.mid, max_attempts=self.max_attempts)
+        ]
+    
     def download_video(self, video: VideoInfo, folder: Path) -> bool:
         """下载单个视频"""
+        job = self.journal.get('bilibili', video.bvid) if self.journal else None
         if self.is_video_downloaded(folder, video.bvid):
             logging.info(f"视频已存在，跳过下载: {video.title}")
+            if job and job['state'] not in job_journal.DONE_STATES:
+                self.journal.set_state('bilibili', video.bvid, job_journal.DOWNLOADED)
             return True
+        if job and job['state'] == job_journal.FAILED and 0 < self.max_attempts <= job['attempts']:
+            logging.warning(f"视频已失败 {job['attempts']} 次，跳过: {video.title} (上次错误: {job['error']})")
+            return False
         
+        if not self.space_guard:
+            return self._download_video(video, folder)
+        
+        # 剩余空间不足时在这里等待，不占用任务日志的 downloading 状态
+        reserved = self.space_guard.acquire(video)
+        success = False
         try:
+            success = self._download_video(video, folder)
+            return success
+        finally:
+            self.space_guard.release(reserved, video, video.download_path if success else None)
+    
+    def _download_video(self, video: VideoInfo, folder: Path) -> bool:
+        """运行BBDown下载视频并记录结果"""
+        if self.journal:
+            # 先写日志再启动BBDown，进程中断后该任务停在 downloading，下次运行时恢复
+            self.journal.start('bilibili', video.bvid)
+        
+        try:
+            # 下载完成后按修改时间查找新文件，文件时间戳精度较低时留出余量
+            started = time.time() - 2
+            
             # 构建bbdown命令 - 根据模式对标原版
             mode = self.config.get('base.mode', 'batch')
             ua = self._get_user_agent()
             
             if mode == 'single':
-                # 对标v3版本：不使用work-dir，需要切换工作目录
+                # 对标v3版本：不使用work-dir，在下载目录中运行BBDown
+                # 只设置子进程的工作目录，不切换整个进程的目录，多线程下载互不影响
                 command = ['bbdown', '-ua', ua, video.bvid]
                 
-                # 保存当前目录，切换到下载目录（对标v3版本行为）
-                original_cwd = os.getcwd()
-                try:
-                    os.chdir(str(folder))
-                    logging.info(f"开始下载: {video.title}")
-                    logging.debug(f"下载命令: {' '.join(command)}")
-                    
-                    # 执行下载
-                    subprocess.run(
-                        command, 
-                        check=True,
-                        capture_output=True,
-                        text=True,
-                        timeout=3600  # 1小时超时
-                    )
-                finally:
-                    # 恢复原工作目录
-                    os.chdir(original_cwd)
+                logging.info(f"开始下载: {video.title}")
+                logging.debug(f"下载命令: {' '.join(command)} (工作目录: {folder})")
+                
+                # 执行下载
+                result = self._run_bbdown(command, video, cwd=str(folder))
             else:
                 # 对标batch版本：使用work-dir参数
                 command = ['bbdown', '--work-dir', str(folder), '-ua', ua, video.bvid]
@@ -868,34 +1550,64 @@ class DownloadManager:
                 logging.debug(f"下载命令: {' '.join(command)}")
                 
                 # 执行下载
-                subprocess.run(
-                    command, 
-                    check=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=3600  # 1小时超时
-                )
+                result = self._run_bbdown(command, video)
+            
+            if not result.success:
+                if result.stalled:
+                    logging.error(f"下载卡住，已结束: {video.title}")
+                elif result.timed_out:
+                    logging.error(f"下载超时: {video.title}")
+                else:
+                    logging.error(f"下载失败: {video.title}")
+                logging.error("错误输出: " + "\n".join(result.output[-10:]))
+                self._journal_failed(video, 'stalled' if result.stalled else 'timeout' if result.timed_out
+                                     else f"returncode {result.returncode}")
+                return False
             
             logging.info(f"下载成功: {video.title}")
+            path = self._record_download(folder, video.bvid, started, result.title)
             
             # 更新视频状态
             video.downloaded = True
-            video.download_path = str(folder)
+            video.download_path = path or str(folder)
             video.download_time = datetime.now()
             
             return True
             
-        except subprocess.CalledProcessError as e:
-            logging.error(f"下载失败: {video.title}")
-            logging.error(f"错误输出: {e.stderr}")
-            return False
-        except subprocess.TimeoutExpired:
-            logging.error(f"下载超时: {video.title}")
-            return False
         except Exception as e:
             logging.error(f"下载异常: {video.title}, 错误: {e}")
+            self._journal_failed(video, str(e))
             return False
     
+    def _journal_failed(self, video: VideoInfo, error: str):
+        if self.journal:
+            self.journal.set_state('bilibili', video.bvid, job_journal.FAILED, error=error)
+    
+    def _run_bbdown(self, command: List[str], video: VideoInfo, cwd: Optional[str] = None) -> BBDownResult:
+        """流式运行BBDown，进度每推进10%记录一次，卡住时提前结束"""
+        last_logged = [-10.0]
+        
+        def on_event(event):
+            if event.type == 'progress':
+                if self.space_guard:
+                    self.space_guard.progress(video, event.percent)
+                if event.percent < last_logged[0]:
+                    last_logged[0] = -10.0  # 下一条音视频流从0%开始
+                if event.percent - last_logged[0] >= 10:
+                    last_logged[0] = event.percent
+                    speed = f" {event.speed / 1024 / 1024:.2f}MB/s" if event.speed else ''
+                    logging.info(f"下载进度: {video.title} {event.percent:.0f}%{speed}")
+            elif event.type in ('stalled', 'timeout'):
+                logging.warning(f"{video.title}: {event.line}")
+            else:
+                logging.debug(f"BBDown: {event.line}")
+        
+        return run_bbdown(
+            command, cwd=cwd, on_event=on_event,
+            stall_timeout=self.config.get('download.stall_timeout', 300),
+            timeout=self.config.get('download.timeout', 3600)
+        )
+    
     def _get_user_agent(self) -> str:
         """获取User-Agent"""
         if self.config.get('network.use_random_ua', True):
@@ -909,8 +1621,10 @@ class DownloadManager:
         if not videos:
             return {'total': 0, 'success': 0, 'skipped': 0, 'failed': 0}
         
-        # 过滤需要下载的视频
-        videos_to_download = [v for v in videos if not self.is_video_downloaded(folder, v.bvid)]
+        # 过滤需要下载的视频，新发布、时长短的优先
+        videos_to_download = sorted(
+            (v for v in videos if not self.is_video_downloaded(folder, v.bvid)), key=download_order_key
+        )
         
         stats = {
             'total': len(videos),
@@ -976,6 +1690,10 @@ class BiliSuperDownloader:
         self.time_range = self.config.get_time_range()
         self.up_list = self.config.get_up_list()
         
+        # 增量扫描状态（time.incremental 开启时使用）
+        data_dir = Path(self.config.get('base.data_dir', './data'))
+        self.scan_state = ScanStateStore(Path(self.config.get('time.state_file', data_dir / 'scan_state.json')))
+        
         logging.info(f"超级下载器初始化完成")
         logging.info(f"工作模式: {self.config.get('base.mode')}")
         logging.info(f"时间范围: {self.time_range}")
@@ -1013,84 +1731,145 @@ class BiliSuperDownloader:
             except Exception as e:
                 logging.warning(f"设置日志文件失败: {e}")
     
+    def _fetch_video_page(self, up: UpInfo, page: int, page_size: int) -> Dict[str, Any]:
+        """获取UP主投稿列表的单页数据"""
+        img_key, sub_key = self.network_manager.get_wbi_keys()
+        
+        for attempt in range(2):
+            if not img_key or not sub_key:
+                raise Exception("无法获取WBI密钥")
+            
+            params = {
+                'mid': up.mid,
+                'ps': str(page_size),
+                'pn': str(page),
+                'order': 'pubdate',
+                'platform': 'web',
+                'web_location': '1550101',
+                'order_avoided': 'true'
+            }
+            
+            # 签名参数
+            signed_params = self.network_manager.enc_wbi(params, img_key, sub_key)
+            url = 'https://api.bilibili.com/x/space/wbi/arc/search?' + \
+                  urllib.parse.urlencode(signed_params)
+            
+            # 发送请求（请求间隔由NetworkManager的速率限制器控制）
+            response = self.network_manager.request_with_retry(url)
+            data = response.json()
+            
+            # 签名失效时刷新密钥并重试一次
+            if data.get('code') in WBI_SIGN_ERROR_CODES and attempt == 0:
+                img_key, sub_key = self.network_manager.refresh_wbi_keys(img_key)
+                continue
+            
+            # 检查响应
+            if data.get('code') != 0:
+                raise Exception(f"API返回错误: {data.get('message', '未知错误')}")
+            return data.get('data', {})
+    
+    def _collect_page_videos(self, page_data: Dict[str, Any], page: int,
+                             videos: List[VideoInfo],
+                             high_water: Optional[Dict[str, Any]] = None) -> bool:
+        """处理单页视频列表，返回True表示已到达列表末尾、时间范围边界或已处理过的视频，应停止获取"""
+        vlist = page_data.get('list', {}).get('vlist', [])
+        if not vlist:
+            logging.info(f"第{page}页无更多视频，停止获取")
+            return True
+        
+        page_videos = 0
+        for video_data in vlist:
+            # 增量模式：遇到上次已处理的视频即停止
+            if high_water and (video_data.get('bvid') == high_water.get('bvid')
+                               or video_data['created'] < high_water.get('created', 0)):
+                logging.info(f"第{page}页到达上次扫描位置，停止获取 (获取到 {page_videos} 个新视频)")
+                return True
+            
+            # 检查时间范围
+            if self.time_range.is_in_range(video_data['created']):
+                video = VideoInfo.from_api_data(video_data)
+                videos.append(video)
+                page_videos += 1
+            elif video_data['created'] < self.time_range.start_time:
+                # 发现更早的视频，停止获取
+                logging.info(f"发现超出时间范围的视频，停止获取")
+                return True
+        
+        logging.info(f"第{page}页获取到 {page_videos} 个符合条件的视频")
+        return False
+    
     def get_new_videos(self, up: UpInfo) -> List[VideoInfo]:
-        """获取UP主的新视频列表"""
-        # 获取WBI密钥
+        """获取UP主的新视频列表 - 第1页确定总页数后并发获取其余页面"""
+        # 获取WBI密钥（优先使用缓存）
         img_key, sub_key = self.network_manager.get_wbi_keys()
         if not img_key or not sub_key:
             raise Exception("无法获取WBI密钥")
         
         videos = []
-        page = 1
         max_pages = self.config.get('network.max_pages', 100)
         page_size = self.config.get('network.page_size', 50)
+        page_workers = max(1, int(self.config.get('network.page_workers', 4)))
+        
+        # 增量模式：读取上次处理到的最新视频
+        high_water = self.scan_state.get(up.mid) if self.config.get('time.incremental', False) else None
         
         logging.info(f"开始获取UP主 {up.name} 的视频列表")
+        if high_water:
+            logging.info(f"增量扫描，上次最新视频: {high_water.get('bvid')}")
         
-        while page <= max_pages:
-            try:
-                # 构建请求参数
-                params = {
-                    'mid': up.mid,
-                    'ps': str(page_size),
-                    'pn': str(page),
-                    'order': 'pubdate',
-                    'platform': 'web',
-                    'web_location': '1550101',
-                    'order_avoided': 'true'
-                }
-                
-                # 签名参数
-                signed_params = self.network_manager.enc_wbi(params, img_key, sub_key)
-                url = 'https://api.bilibili.com/x/space/wbi/arc/search?' + \
-                      urllib.parse.urlencode(signed_params)
-                
-                # 发送请求
-                response = self.network_manager.request_with_retry(url)
-                data = response.json()
-                
-                # 检查响应
-                if data.get('code') != 0:
-                    logging.error(f"API返回错误: {data.get('message', '未知错误')}")
-                    break
-                
-                vlist = data.get('data', {}).get('list', {}).get('vlist', [])
-                if not vlist:
-                    logging.info(f"第{page}页无更多视频，停止获取")
-                    break
-                
-                # 处理视频列表
-                page_videos = 0
-                for video_data in vlist:
-                    # 检查时间范围
-                    if self.time_range.is_in_range(video_data['created']):
-                        video = VideoInfo.from_api_data(video_data)
-                        videos.append(video)
-                        page_videos += 1
-                    elif video_data['created'] < self.time_range.start_time:
-                        # 发现更早的视频，停止获取
-                        logging.info(f"发现超出时间范围的视频，停止获取")
-                        return videos
+        try:
+            first_page = self._fetch_video_page(up, 1, page_size)
+        except Exception as e:
+            logging.error(f"获取第1页视频失败: {e}")
+            return videos
+        
+        if self._collect_page_videos(first_page, 1, videos, high_water):
+            logging.info(f"UP主 {up.name} 共获取到 {len(videos)} 个新视频")
+            return videos
+        
+        total_count = first_page.get('page', {}).get('count', 0)
+        total_pages = min(max_pages, max(1, math.ceil(total_count / page_size)))
+        logging.info(f"UP主 {up.name} 共有 {total_count} 个视频，{total_pages} 页")
+        
+        if total_pages > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=page_workers) as executor:
+                def submit(page):
+                    return executor.submit(self._fetch_video_page, up, page, page_size)
                 
-                logging.info(f"第{page}页获取到 {page_videos} 个符合条件的视频")
-                page += 1
+                # 最多预取 page_workers 页，按页码顺序处理结果，保证顺序并支持在时间边界提前停止
+                next_submit = 2
+                pending = {}
+                while next_submit <= total_pages and len(pending) < page_workers:
+                    pending[next_submit] = submit(next_submit)
+                    next_submit += 1
                 
-                # 请求间隔
-                delay = self.config.get('network.delay', 0.5)
-                time.sleep(delay)
+                page = 2
+                while page in pending:
+                    future = pending.pop(page)
+                    try:
+                        page_data = future.result()
+                    except Exception as e:
+                        logging.error(f"获取第{page}页视频失败: {e}")
+                        break
+                    
+                    if self._collect_page_videos(page_data, page, videos, high_water):
+                        break
+                    
+                    if next_submit <= total_pages:
+                        pending[next_submit] = submit(next_submit)
+                        next_submit += 1
+                    page += 1
                 
-            except Exception as e:
-                logging.error(f"获取第{page}页视频失败: {e}")
-                break
+                # 取消尚未开始的预取请求
+                for future in pending.values():
+                    future.cancel()
         
         logging.info(f"UP主 {up.name} 共获取到 {len(videos)} 个新视频")
         return videos
     
-    def process_single_up(self, up: UpInfo) -> Dict[str, Any]:
-        """处理单个UP主"""
-        logging.info(f"===== 开始处理 UP主: {up.name} ({up.mid}) =====")
-        
-        result = {
+    def _new_result(self, up: UpInfo) -> Dict[str, Any]:
+        """创建UP主处理结果"""
+        return {
             'up_name': up.name,
             'up_mid': up.mid,
             'success': False,
@@ -1098,30 +1877,70 @@ class BiliSuperDownloader:
             'videos_downloaded': 0,
             'videos_skipped': 0,
             'videos_failed': 0,
+            'videos_resumed': 0,
             'error': None
         }
+    
+    def _scan_up(self, up: UpInfo, result: Dict[str, Any]) -> tuple:
+        """扫描UP主：准备下载目录、获取新视频并保存视频数据"""
+        # 获取下载文件夹
+        download_folder = self.download_manager.get_up_folder(up)
+        logging.info(f"下载目录: {download_folder}")
+        
+        # 清理文件夹
+        self.download_manager.clean_folder(download_folder)
+        
+        # 获取新视频
+        videos = self.get_new_videos(up)
+        result['videos_found'] = len(videos)
+        
+        # 保存视频数据（只在single模式下，对标v3版本）
+        if videos and self.data_manager and self.config.get('data.format'):
+            self.data_manager.save_videos(videos, up_info=up, up_name=up.name)
+        
+        journal = self.download_manager.journal
+        if journal:
+            # 新视频写入任务日志后即可推进增量扫描位置，下载失败或中断的任务从日志恢复
+            self.download_manager.journal_discovered(up, videos, download_folder)
+            self._update_high_water(up, videos, result)
+            
+            scanned = {v.bvid for v in videos}
+            resumed = [v for v in self.download_manager.unfinished_videos(up) if v.bvid not in scanned]
+            if resumed:
+                logging.info(f"UP主 {up.name} 从任务日志恢复 {len(resumed)} 个未完成的视频")
+                videos = videos + resumed
+                result['videos_resumed'] = len(resumed)
+        
+        return videos, download_folder
+    
+    def _update_high_water(self, up: UpInfo, videos: List[VideoInfo], result: Dict[str, Any]):
+        """推进增量扫描位置到本次扫描到的最新视频
+
+        启用任务日志时即使有下载失败也推进，失败的视频从任务日志恢复重试；
+        没有任务日志时有下载失败则保持不变，下次重新扫描到失败的视频。
+        """
+        if not self.config.get('time.incremental', False) or not videos:
+            return
+        if result['videos_failed'] and not self.download_manager.journal:
+            return
+        newest = max(videos, key=lambda v: v.created if isinstance(v.created, int) else 0)
+        if isinstance(newest.created, int):
+            self.scan_state.update(up.mid, newest.created, newest.bvid)
+    
+    def process_single_up(self, up: UpInfo) -> Dict[str, Any]:
+        """处理单个UP主"""
+        logging.info(f"===== 开始处理 UP主: {up.name} ({up.mid}) =====")
+        
+        result = self._new_result(up)
         
         try:
-            # 获取下载文件夹
-            download_folder = self.download_manager.get_up_folder(up)
-            logging.info(f"下载目录: {download_folder}")
-            
-            # 清理文件夹
-            self.download_manager.clean_folder(download_folder)
-            
-            # 获取新视频
-            videos = self.get_new_videos(up)
-            result['videos_found'] = len(videos)
+            videos, download_folder = self._scan_up(up, result)
             
             if not videos:
                 logging.info(f"UP主 {up.name} 没有新视频")
                 result['success'] = True
                 return result
             
-            # 保存视频数据（只在single模式下，对标v3版本）
-            if self.data_manager and self.config.get('data.format'):
-                self.data_manager.save_videos(videos, up_info=up, up_name=up.name)
-            
             # 下载视频（如果启用了下载）
             if self.config.get('download.enabled', True):
                 download_stats = self.download_manager.download_videos_batch(
@@ -1140,6 +1959,7 @@ class BiliSuperDownloader:
             up.last_update = datetime.now()
             up.video_count = len(videos)
             up.download_count = result['videos_downloaded']
+            self._update_high_water(up, videos, result)
             
             result['success'] = True
             logging.info(f"UP主 {up.name} 处理完成")
@@ -1174,25 +1994,79 @@ class BiliSuperDownloader:
         
         return self.process_single_up(single_up)
     
+    def _scan_up_safe(self, up: UpInfo) -> tuple:
+        """批量模式的扫描任务，异常记录到结果中而不向外抛出"""
+        result = self._new_result(up)
+        try:
+            videos, download_folder = self._scan_up(up, result)
+            result['success'] = True
+            logging.info(f"UP主 {up.name} 扫描完成，发现 {len(videos)} 个新视频")
+            return result, videos, download_folder
+        except Exception as e:
+            logging.error(f"扫描UP主 {up.name} 失败: {e}")
+            logging.error(traceback.format_exc())
+            result['error'] = str(e)
+            return result, [], None
+    
     def run_batch_mode(self) -> List[Dict[str, Any]]:
-        """运行批量模式（兼容batch版本）"""
+        """运行批量模式 - 并发扫描UP主，下载任务进入按优先级调度的全局下载队列"""
         logging.info("运行批量模式")
         
-        results = []
         enabled_ups = [up for up in self.up_list if up.enabled]
-        
-        logging.info(f"共有 {len(enabled_ups)} 个启用的UP主")
-        
-        # 串行处理UP主（避免并发请求过多）
-        for i, up in enumerate(enabled_ups, 1):
-            logging.info(f"处理进度: {i}/{len(enabled_ups)}")
-            result = self.process_single_up(up)
-            results.append(result)
+        scan_workers = max(1, int(self.config.get('network.scan_workers', 4)))
+        download_workers = max(1, int(self.config.get('download.max_workers', 1)))
+        per_up_limit = max(1, int(self.config.get('download.per_up_limit', 1)))
+        download_enabled = self.config.get('download.enabled', True)
+        
+        logging.info(f"共有 {len(enabled_ups)} 个启用的UP主，扫描线程 {scan_workers}，下载线程 {download_workers}，"
+                     f"每个UP主最多同时下载 {per_up_limit}")
+        
+        scheduler = DownloadScheduler(self.download_manager, download_workers, per_up_limit)
+        scheduler.start()
+        
+        # 请求频率由NetworkManager的全局速率限制器统一控制，扫描线程之间无需额外延迟
+        # 高优先级的UP主先扫描，尽早进入下载队列
+        results = [None] * len(enabled_ups)
+        scan_order = sorted(range(len(enabled_ups)), key=lambda index: -enabled_ups[index].priority)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=scan_workers) as scan_pool:
+            scan_futures = {
+                scan_pool.submit(self._scan_up_safe, enabled_ups[index]): index
+                for index in scan_order
+            }
+            found_videos = [[] for _ in enabled_ups]
             
-            # UP主间的延迟
-            if i < len(enabled_ups):
-                delay = self.config.get('network.delay', 0.5) * 2
-                time.sleep(delay)
+            for i, future in enumerate(concurrent.futures.as_completed(scan_futures), 1):
+                result, videos, download_folder = future.result()
+                index = scan_futures[future]
+                results[index] = result
+                found_videos[index] = videos
+                logging.info(f"扫描进度: {i}/{len(enabled_ups)}")
+                
+                if not videos:
+                    continue
+                if not download_enabled:
+                    result['videos_skipped'] = len(videos)
+                    continue
+                
+                # 扫描完成的UP主立即把下载任务放入全局队列，不阻塞其他UP主的扫描
+                for video in videos:
+                    if self.download_manager.is_video_downloaded(download_folder, video.bvid):
+                        result['videos_skipped'] += 1
+                        continue
+                    scheduler.submit(enabled_ups[index], video, download_folder, result)
+        
+        scheduler.close()
+        
+        # 更新UP主信息，按配置顺序返回结果
+        for up, result, videos in zip(enabled_ups, results, found_videos):
+            if result['success']:
+                up.last_update = datetime.now()
+                up.video_count = result['videos_found']
+                up.download_count = result['videos_downloaded']
+                self._update_high_water(up, videos, result)
+            logging.info(f"UP主 {up.name}: 发现 {result['videos_found']}, 恢复 {result['videos_resumed']}, "
+                         f"下载 {result['videos_downloaded']}, 跳过 {result['videos_skipped']}, "
+                         f"失败 {result['videos_failed']}")
         
         return results
     
@@ -1206,6 +2080,11 @@ class BiliSuperDownloader:
         start_time = datetime.now()
         
         try:
+            # 先回收上次运行后已上传的文件，腾出下载空间
+            freed = self.download_manager.reclaim_uploaded()
+            if freed:
+                logging.info(f"已回收 {freed / 1024 ** 3:.1f}GB 已上传的文件")
+            
             if mode == 'single':
                 results = self.run_single_mode()
             elif mode == 'batch':
@@ -1218,6 +2097,8 @@ class BiliSuperDownloader:
             duration = end_time - start_time
             
             logging.info(f"下载器运行完成，耗时: {duration}")
+            if self.download_manager.journal:
+                logging.info(f"任务日志状态: {self.download_manager.journal.counts('bilibili')}")
             
             return {
                 'success': True,
@@ -1312,8 +2193,12 @@ def create_argument_parser() -> argparse.ArgumentParser:
                        help='仅抓取信息，不下载视频')
     parser.add_argument('--time-range', choices=['recent', 'daily', 'weekly', 'monthly'],
                        help='预设时间范围')
-    parser.add_argument('--data-format', choices=['excel', 'json', 'csv'],
-                       help='数据保存格式')
+    parser.add_argument('--data-format', choices=['excel', 'sqlite', 'json', 'csv'],
+                       help='数据保存格式（默认excel；sqlite按bvid增量写入，可用 --export 导出表格）')
+    parser.add_argument('--export', choices=['excel', 'csv'],
+                       help='从SQLite数据库导出视频数据后退出')
+    parser.add_argument('--export-path', type=str,
+                       help='导出文件路径 (默认保存到data_dir)')
     parser.add_argument('--clean-only', action='store_true',
                        help='仅清理文件夹，不执行其他操作')
     parser.add_argument('--generate-config', action='store_true',
@@ -1369,11 +2254,23 @@ def main():
         if args.time_range:
             downloader.config.set('time.current', args.time_range)
         if args.data_format:
-            downloader.config.set('data.storage.primary_format', args.data_format)
+            downloader.config.set('data.format', args.data_format)
+            if downloader.data_manager:
+                downloader.data_manager.primary_format = args.data_format
         
         # 重新初始化时间范围
         downloader.time_range = downloader.config.get_time_range()
         
+        # 导出模式
+        if args.export:
+            data_manager = downloader.data_manager or DataManager(downloader.config)
+            mid = args.mid if args.mid else None
+            exported = data_manager.export(args.export, args.export_path, mid)
+            if not exported:
+                sys.exit(1)
+            print(f"✅ 数据已导出: {exported}")
+            return
+        
         # 仅清理模式
         if args.clean_only:
             logging.info("执行清理模式")
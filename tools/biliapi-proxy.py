@@ -1,6 +1,16 @@
-from flask import Flask, request, redirect, Response
+from flask import Flask, request, redirect, Response, jsonify, stream_with_context
 import requests
+from requests.adapters import HTTPAdapter
 import random
+import time
+import threading
+import urllib.parse
+import hashlib
+import json
+import queue
+import atexit
+import concurrent.futures
+from collections import OrderedDict
 from datetime import datetime
 import os
 
@@ -8,35 +18,390 @@ app = Flask(__name__)
 
 # 配置日志记录开关
 LOGGING_ENABLED = os.getenv('LOGGING_ENABLED', 'true').lower() == 'true'
+LOG_FILE = os.getenv('LOG_FILE', 'proxy.log')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(20 * 1024 * 1024)))  # 日志文件超过此大小后轮转
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))  # 保留的轮转文件数量
+LOG_FLUSH_INTERVAL = 1.0  # 后台日志线程最长多久写一次文件，单位：秒
+LOG_QUEUE_SIZE = 10000  # 日志队列满时直接丢弃，不阻塞请求线程
 RETRY_COUNT = 3
 TIMEOUT = 5  # 请求超时时间，单位：秒
+# 上游请求模式：sequential(依次尝试) | hedge(上一个上游超过HEDGE_DELAY未返回则同时请求下一个) | race(同时请求所有上游)
+PROXY_MODE = os.getenv('PROXY_MODE', 'hedge').lower()
+HEDGE_DELAY = float(os.getenv('HEDGE_DELAY', '0.3'))  # 对冲请求的等待时间，单位：秒
+POOL_SIZE = int(os.getenv('POOL_SIZE', '32'))  # 每个上游的连接池大小
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))  # 连续失败多少次后熔断
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', '30'))  # 熔断后多久放行一次探测请求，单位：秒
+EWMA_ALPHA = 0.2  # 延迟和成功率的指数加权系数
+# 其余路径的处理方式：redirect(302重定向到备选域名) | proxy(由代理直接转发，流式返回响应体)
+CATCHALL_MODE = os.getenv('CATCHALL_MODE', 'redirect').lower()
+STREAM_CHUNK_SIZE = 64 * 1024  # 流式转发时每次读取的字节数
+# 逐跳头部不转发
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+                      'te', 'trailer', 'transfer-encoding', 'upgrade'}
+# playurl 响应缓存：TTL 需小于 playurl 签名的有效期；CACHE_SIZE 为0时关闭缓存
+CACHE_TTL = float(os.getenv('CACHE_TTL', '60'))
+CACHE_SIZE = int(os.getenv('CACHE_SIZE', '512'))
+# WBI 签名参数每次请求都会变化，计算缓存键时忽略
+CACHE_IGNORED_PARAMS = {'w_rid', 'wts'}
 
-# 目标URL列表
-api_urls = [
+# 目标URL列表（可通过环境变量 API_URLS 以逗号分隔覆盖，便于本地压测）
+api_urls = os.getenv('API_URLS', ','.join([
     'https://api.bilibili.com/x/player/wbi/playurl',
     'https://api.biliapi.net/x/player/wbi/playurl',
     'https://api.biliapi.com/x/player/wbi/playurl'
-]
+])).split(',')
 
-# 备选域名列表
-redirect_domains = [
+# 备选域名列表（可通过环境变量 REDIRECT_DOMAINS 以逗号分隔覆盖）
+redirect_domains = os.getenv('REDIRECT_DOMAINS', ','.join([
     'https://api.biliapi.net',
     'https://api.biliapi.com'
-]
+])).split(',')
 
-def proxy_request(url, headers, data, method):
+class UpstreamHealth:
+    """上游健康状态：延迟EWMA、成功率EWMA和熔断器（closed / open / half-open）"""
+
+    def __init__(self):
+        self.latency = None
+        self.success_rate = 1.0
+        self.consecutive_failures = 0
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def _refresh_state(self):
+        # 熔断冷却结束后进入半开状态，允许一个探测请求
+        if self.state == 'open' and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+            self.state = 'half-open'
+            self.probing = False
+
+    def is_available(self):
+        with self.lock:
+            self._refresh_state()
+            return self.state == 'closed' or (self.state == 'half-open' and not self.probing)
+
+    def allow_request(self):
+        # 与 is_available 相同，但半开状态下会占用唯一的探测名额；返回放行时的状态，不放行时返回 None
+        with self.lock:
+            self._refresh_state()
+            if self.state == 'closed':
+                return 'closed'
+            if self.state == 'half-open' and not self.probing:
+                self.probing = True
+                return 'half-open'
+            return None
+
+    def release_probe(self):
+        # 探测请求被取消、没有结果可记录时归还探测名额
+        with self.lock:
+            if self.state == 'half-open':
+                self.probing = False
+
+    def record(self, success, latency):
+        with self.lock:
+            # 失败往往返回得很快，只用成功请求更新延迟，避免失败的上游反而显得更快
+            if success:
+                self.latency = latency if self.latency is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+            self.success_rate = EWMA_ALPHA * (1.0 if success else 0.0) + (1 - EWMA_ALPHA) * self.success_rate
+            if success:
+                self.consecutive_failures = 0
+                self.state = 'closed'
+                self.probing = False
+            else:
+                self.consecutive_failures += 1
+                if self.state == 'half-open' or self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+                    self.state = 'open'
+                    self.opened_at = time.monotonic()
+                    self.probing = False
+
+    def score(self):
+        # 分数越低越好：期望延迟 / 成功率；没有数据时按100ms估计
+        latency = self.latency if self.latency is not None else 0.1
+        return latency / max(self.success_rate, 0.05)
+
+    def snapshot(self):
+        with self.lock:
+            self._refresh_state()
+            return {
+                'state': self.state,
+                'latency_ms': round(self.latency * 1000) if self.latency is not None else None,
+                'success_rate': round(self.success_rate, 3),
+                'consecutive_failures': self.consecutive_failures,
+                'score': round(self.score(), 4)
+            }
+
+def origin_of(url):
+    parts = urllib.parse.urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+# 按域名记录健康状态，playurl 和重定向路径共用（重定向域名的健康度来自 playurl 请求的结果）
+upstream_health = {origin_of(url): UpstreamHealth() for url in api_urls + redirect_domains}
+
+def rank_by_health(urls):
+    # 可用的排在前面，再按分数排序；分数相同时随机，保持负载分散
+    def key(url):
+        health = upstream_health[origin_of(url)]
+        return (not health.is_available(), health.score(), random.random())
+    return sorted(urls, key=key)
+
+def create_session():
+    # 每个上游一个带连接池的会话，复用TCP/TLS连接
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+upstream_sessions = {base_url: create_session() for base_url in api_urls}
+redirect_sessions = {base_url: create_session() for base_url in redirect_domains}
+upstream_executor = concurrent.futures.ThreadPoolExecutor(max_workers=POOL_SIZE)
+
+class PlayurlCache:
+    """playurl 的短TTL LRU缓存，同时合并并发的相同请求，只向上游发出一次"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, response)
+        self.inflight = {}  # key -> Future
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(query_string, headers):
+        # 参数排序并去掉签名参数；不同账号的Cookie返回的清晰度不同，Cookie也计入缓存键
+        params = sorted((k, v) for k, v in urllib.parse.parse_qsl(query_string, keep_blank_values=True)
+                        if k not in CACHE_IGNORED_PARAMS)
+        cookie = next((value for key, value in headers.items() if key.lower() == 'cookie'), '')
+        return urllib.parse.urlencode(params), hashlib.sha1(cookie.encode('utf-8')).hexdigest()
+
+    def get_or_fetch(self, key, fetch):
+        """返回 (response, success, 来源)，来源为 hit / coalesced / miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], True, 'hit'
+            if entry:
+                del self.entries[key]
+            future = self.inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                self.misses += 1
+                future = concurrent.futures.Future()
+                self.inflight[key] = future
+            else:
+                self.coalesced += 1
+        if not is_leader:
+            response, success = future.result()
+            return response, success, 'coalesced'
+
+        try:
+            response, success = fetch()
+        except Exception as e:
+            with self.lock:
+                del self.inflight[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            del self.inflight[key]
+            if success:
+                self.entries[key] = (time.monotonic() + self.ttl, response)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+        future.set_result((response, success))
+        return response, success, 'miss'
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced
+            }
+
+playurl_cache = PlayurlCache(CACHE_SIZE, CACHE_TTL) if CACHE_SIZE > 0 else None
+
+def proxy_request(session, url, headers, data, method, cookies, cancelled=None):
     for _ in range(RETRY_COUNT):
+        # 其他上游已经返回结果时不再重试，尽快让出线程池
+        if cancelled is not None and cancelled.is_set():
+            return None
         try:
-            resp = requests.request(method, url, headers=headers, data=data, cookies=request.cookies, timeout=TIMEOUT)
+            resp = session.request(method, url, headers=headers, data=data, cookies=cookies, timeout=TIMEOUT)
             return resp
         except requests.RequestException:
             continue
     return None
 
+def is_valid_response(response):
+    return response is not None and response.status_code == 200 and b'"result":"suee"' in response.content
+
+def fetch_upstream(base_url, query_string, headers, data, method, cookies, cancelled=None, probe=False):
+    start = time.monotonic()
+    response = proxy_request(upstream_sessions[base_url], f"{base_url}?{query_string}", headers, data, method, cookies,
+                             cancelled)
+    elapsed = time.monotonic() - start
+    # 被取消而没有结果的请求不计入上游健康状态，占用的探测名额归还
+    health = upstream_health[origin_of(base_url)]
+    if response is None and cancelled is not None and cancelled.is_set():
+        if probe:
+            health.release_probe()
+    else:
+        health.record(is_valid_response(response), elapsed)
+    return base_url, response, elapsed
+
+def race_upstreams(query_string, headers, data, method, cookies, log_info):
+    # 按模式决定启动下一个上游前的等待时间，None 表示等待当前上游结束
+    delay = {'race': 0, 'sequential': None}.get(PROXY_MODE, HEDGE_DELAY)
+    pending = set()
+    # 得到结果后通知仍在进行的对冲请求在下一次重试前退出，尚未开始的直接取消
+    cancelled = threading.Event()
+
+    # 按健康分数排序，跳过处于熔断状态的上游；全部熔断时仍尝试分数最好的一个
+    candidates = [url for url in rank_by_health(api_urls) if upstream_health[origin_of(url)].is_available()]
+    bypass = not candidates
+    next_index = 0
+    probes = {}  # 占用了探测名额的请求 -> 上游
+
+    def launch_next():
+        # 真正发出请求时才占用半开状态的探测名额，名额已被其他请求占用时跳过该上游
+        nonlocal next_index
+        while next_index < len(candidates):
+            base_url = candidates[next_index]
+            next_index += 1
+            state = 'closed' if bypass else upstream_health[origin_of(base_url)].allow_request()
+            if state is None:
+                continue
+            future = upstream_executor.submit(
+                fetch_upstream, base_url, query_string, headers, data, method, cookies, cancelled, state == 'half-open'
+            )
+            pending.add(future)
+            if state == 'half-open':
+                probes[future] = base_url
+            return
+
+    try:
+        launch_next()
+        if not pending:
+            bypass = True
+            candidates = rank_by_health(api_urls)[:1]
+            next_index = 0
+            launch_next()
+        if bypass:
+            log_info["breaker_bypass"] = True
+        while pending:
+            timeout = delay if next_index < len(candidates) else None
+            done, _ = concurrent.futures.wait(pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+            pending.difference_update(done)
+            for future in done:
+                base_url, response, elapsed = future.result()
+                valid = is_valid_response(response)
+                if valid:
+                    outcome = "normal"
+                elif response is not None and response.status_code == 200:
+                    outcome = "no_valid_result"
+                else:
+                    outcome = "failed"
+                log_info["upstreams"].append({
+                    "url": base_url,
+                    "outcome": outcome,
+                    "status": response.status_code if response is not None else None,
+                    "elapsed_ms": round(elapsed * 1000, 1)
+                })
+                if valid:
+                    return response, True
+            # 当前上游超时未返回或已失败，启动下一个上游
+            if next_index < len(candidates):
+                launch_next()
+        # 没有上游返回有效结果
+        return None, False
+    finally:
+        cancelled.set()
+        for future in pending:
+            if future.cancel() and future in probes:
+                upstream_health[origin_of(probes[future])].release_probe()
+
+class JsonLineLogger:
+    """后台线程批量写入 JSON Lines 日志，按文件大小轮转，请求线程只负责入队"""
+
+    def __init__(self, path, max_bytes, backup_count):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def log(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _rotate(self):
+        # proxy.log -> proxy.log.1 -> ... -> proxy.log.N，最旧的被覆盖
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _write(self, records):
+        lines = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        try:
+            with open(self.path, 'a', encoding='utf-8') as log_file:
+                log_file.write(lines)
+                size = log_file.tell()
+            if self.max_bytes > 0 and size >= self.max_bytes:
+                self._rotate()
+        except OSError as e:
+            print(f"写入日志失败: {e}")
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            stop = batch[0] is None
+            # 攒够一批或等待超时后统一写入
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while not stop and len(batch) < 1000:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                else:
+                    batch.append(record)
+            records = [record for record in batch if record is not None]
+            if records:
+                self._write(records)
+            if stop:
+                return
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+request_logger = JsonLineLogger(LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT) if LOGGING_ENABLED else None
+if request_logger is not None:
+    atexit.register(request_logger.close)
+
 def log_request_info(log_info):
-    if LOGGING_ENABLED:
-        with open('proxy.log', 'a') as log_file:
-            log_file.write(f"{log_info}\n")
+    if request_logger is not None:
+        request_logger.log(log_info)
 
 @app.route('/x/player/wbi/playurl', methods=['GET', 'POST', 'PUT', 'DELETE'])
 def handle_specific_path():
@@ -45,34 +410,28 @@ def handle_specific_path():
     data = request.get_data()
     method = request.method
     
-    response = None
-    success = False
-    
     log_info = {
-        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "timestamp": datetime.now().isoformat(timespec='milliseconds'),
         "url": f"{request.base_url}?{query_string}",
-        "results": [],
+        "method": method,
+        "mode": PROXY_MODE,
+        "upstreams": [],
         "final_decision": None
     }
+    start = time.monotonic()
     
-    for base_url in api_urls:
-        url = f"{base_url}?{query_string}"
-        response = proxy_request(url, headers, data, method)
-        
-        if response and response.status_code == 200:
-            content = response.content
-            if b'"result":"suee"' in content:
-                log_info["results"].append(f"{base_url} - Normal")
-                success = True
-                break
-            else:
-                log_info["results"].append(f"{base_url} - Exception: No valid result found")
-                response = None  # 认为这是一次失败，继续尝试下一个 URL
-                continue
-        else:
-            log_info["results"].append(f"{base_url} - Failed")
-            response = None  # 确保继续尝试下一个 URL
+    # 返回第一个包含有效结果的上游响应，其余请求的结果直接丢弃
+    cookies = dict(request.cookies)
+    if playurl_cache is not None and method == 'GET':
+        # 缓存命中直接返回；相同请求正在进行时等待其结果，不再重复请求上游
+        cache_key = PlayurlCache.make_key(query_string, headers)
+        response, success, log_info["cache"] = playurl_cache.get_or_fetch(
+            cache_key, lambda: race_upstreams(query_string, headers, data, method, cookies, log_info)
+        )
+    else:
+        response, success = race_upstreams(query_string, headers, data, method, cookies, log_info)
 
+    log_info["total_ms"] = round((time.monotonic() - start) * 1000, 1)
     if success:
         log_info["final_decision"] = "Normal"
         log_request_info(log_info)
@@ -84,16 +443,54 @@ def handle_specific_path():
     else:
         log_info["final_decision"] = "Failed"
         log_request_info(log_info)
-        proxy_response = Response(response.content if response else 'Service Unavailable', status=response.status_code if response else 503)
-        for key, value in (response.headers.items() if response else []):
-            if key.lower() not in ['content-encoding', 'content-length', 'transfer-encoding', 'connection']:
-                proxy_response.headers[key] = value
-        return proxy_response
+        # 上游的错误响应或不含有效结果的200都不转发给客户端
+        return Response('Service Unavailable', status=503)
+
+def relay_body(upstream):
+    # 原样转发压缩后的字节，内存占用与响应体大小无关
+    try:
+        for chunk in upstream.raw.stream(STREAM_CHUNK_SIZE, decode_content=False):
+            yield chunk
+    finally:
+        upstream.close()
+
+def reverse_proxy(base_url, path):
+    target_url = f"{base_url}/{path}"
+    if request.query_string:
+        target_url += f"?{request.query_string.decode('utf-8')}"
+    headers = {key: value for key, value in request.headers if key.lower() != 'host'}
+    health = upstream_health[origin_of(base_url)]
+
+    start = time.monotonic()
+    try:
+        upstream = redirect_sessions[base_url].request(
+            request.method, target_url, headers=headers, data=request.get_data(),
+            cookies=request.cookies, timeout=TIMEOUT, stream=True, allow_redirects=False
+        )
+    except requests.RequestException:
+        health.record(False, time.monotonic() - start)
+        return Response('Bad Gateway', status=502)
+    health.record(upstream.status_code < 500, time.monotonic() - start)
+
+    response_headers = [(key, value) for key, value in upstream.headers.items()
+                        if key.lower() not in HOP_BY_HOP_HEADERS | {'server', 'date'}]
+    return Response(stream_with_context(relay_body(upstream)), status=upstream.status_code, headers=response_headers)
+
+@app.route('/_proxy/status')
+def proxy_status():
+    return jsonify({
+        'upstreams': {name: health.snapshot() for name, health in upstream_health.items()},
+        'cache': playurl_cache.stats() if playurl_cache is not None else None,
+        'log_dropped': request_logger.dropped if request_logger is not None else 0
+    })
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE'])
 def handle_all_requests(path):
-    base_url = random.choice(redirect_domains)
+    base_url = rank_by_health(redirect_domains)[0]
+    if CATCHALL_MODE == 'proxy':
+        # 由代理直接转发，客户端省去一次重定向往返
+        return reverse_proxy(base_url, path)
     target_url = f"{base_url}/{path}"
     
     if request.query_string:
@@ -1,18 +1,21 @@
-from functools import reduce
+from functools import lru_cache
 from hashlib import md5
 import urllib.parse
 import time
+import json
 import requests
 import pandas as pd
 import concurrent.futures
 import subprocess
 import os
+import re
 import logging
 import random
 import shutil
 import send2trash
 from datetime import datetime
 import argparse
+from download_archive import DownloadArchive
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -29,6 +32,9 @@ MID = '356010767'  # B站用户ID
 DELAY = 0.5  # 请求延迟时间
 MAX_PAGES = 100  # 最大抓取页数
 MAX_WORKERS = 2  # 多线程下载的最大线程数
+WBI_CACHE_FILE = os.path.expanduser('~/.cache/bili_wbi_keys.json')  # WBI密钥缓存文件（与bili-super-downloader.py共用）
+WBI_CACHE_TTL = 6 * 3600  # WBI密钥缓存有效期（秒）
+WBI_SIGN_ERROR_CODES = (-352, -403)  # 签名失效时的错误码，需要刷新密钥
 
 # 示例使用的Cookie
 cookie = '''ck'''
@@ -95,8 +101,35 @@ def clean_subfolders(download_dir):
             logging.info(f"正在删除子文件夹及其内容: {item_path}")
             send2trash.send2trash(item_path)
 
-# 获取最新的 img_key 和 sub_key
-def get_wbi_keys():
+# 读取磁盘上的 wbi 密钥缓存，过期或不存在时返回 None
+def load_cached_wbi_keys():
+    try:
+        with open(WBI_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if time.time() - cache.get('fetched_at', 0) < WBI_CACHE_TTL and cache.get('img_key') and cache.get('sub_key'):
+            return cache['img_key'], cache['sub_key']
+    except (OSError, ValueError):
+        pass
+    return None
+
+# 保存 wbi 密钥缓存（先写临时文件再替换，避免多个进程同时写入时损坏）
+def save_cached_wbi_keys(img_key, sub_key):
+    try:
+        os.makedirs(os.path.dirname(WBI_CACHE_FILE), exist_ok=True)
+        tmp_path = f"{WBI_CACHE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'img_key': img_key, 'sub_key': sub_key, 'fetched_at': time.time()}, f)
+        os.replace(tmp_path, WBI_CACHE_FILE)
+    except OSError as e:
+        logging.warning(f"保存 wbi keys 缓存失败: {e}")
+
+# 获取最新的 img_key 和 sub_key，优先使用缓存
+def get_wbi_keys(force_refresh=False):
+    if not force_refresh:
+        cached = load_cached_wbi_keys()
+        if cached:
+            return cached
+
     headers = {
         'User-Agent': get_user_agent(),
         'Referer': 'https://www.bilibili.com/'
@@ -109,12 +142,14 @@ def get_wbi_keys():
         sub_url = json_content['data']['wbi_img']['sub_url']
         img_key = img_url.rsplit('/', 1)[1].split('.')[0]
         sub_key = sub_url.rsplit('/', 1)[1].split('.')[0]
+        save_cached_wbi_keys(img_key, sub_key)
         return img_key, sub_key
     except Exception as e:
         logging.error(f"获取 wbi keys 失败: {e}")
         return None, None
 
-# 对 imgKey 和 subKey 进行字符顺序打乱编码
+# 对 imgKey 和 subKey 进行字符顺序打乱编码（同一组密钥只计算一次）
+@lru_cache(maxsize=8)
 def get_mixin_key(orig):
     MIXIN_KEY_ENC_TAB = [
         46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
@@ -122,7 +157,7 @@ def get_mixin_key(orig):
         61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
         36, 20, 34, 44, 52
     ]
-    return reduce(lambda s, i: s + orig[i], MIXIN_KEY_ENC_TAB, '')[:32]
+    return ''.join(orig[i] for i in MIXIN_KEY_ENC_TAB)[:32]
 
 # 为请求参数进行 wbi 签名
 def enc_wbi(params, img_key, sub_key):
@@ -158,6 +193,7 @@ def fetch_bilibili_videos(mid, max_pages=10, start_page=1, cookie=None, delay=0.
     else:
         start_date_timestamp = 0  # 不限制起始日期
     
+    key_refreshed = False
     while current_page < start_page + max_pages:
         # 设置请求参数
         params = {
@@ -196,6 +232,15 @@ def fetch_bilibili_videos(mid, max_pages=10, start_page=1, cookie=None, delay=0.
         
         result = response.json()
         
+        # 签名失效时刷新 wbi keys 并重试当前页（只刷新一次）
+        if result.get('code') in WBI_SIGN_ERROR_CODES and not key_refreshed:
+            logging.warning(f"wbi 签名失效({result.get('code')})，刷新 wbi keys 后重试")
+            img_key, sub_key = get_wbi_keys(force_refresh=True)
+            key_refreshed = True
+            if not img_key or not sub_key:
+                break
+            continue
+        
         # 检查是否有更多视频
         if 'data' not in result or 'list' not in result['data'] or not result['data']['list']['vlist']:
             break
@@ -236,12 +281,17 @@ def save_to_excel(videos, file_path):
     # 保存为Excel文件
     df.to_excel(file_path, index=False)
 
-# 检查视频文件是否已存在
-def is_video_downloaded(bvid, download_dir):
-    for file_name in os.listdir(download_dir):
-        if bvid in file_name:
-            return True
-    return False
+# 文件名中的 BV 号
+BVID_PATTERN = re.compile(r'BV[0-9A-Za-z]{10}')
+
+# 一次扫描下载目录，建立文件名中出现过的 BV 号集合
+def build_downloaded_index(download_dir):
+    with os.scandir(download_dir) as entries:
+        return {bvid for entry in entries for bvid in BVID_PATTERN.findall(entry.name)}
+
+# 检查视频是否已下载：下载归档中有记录，或下载目录中存在对应文件
+def is_video_downloaded(bvid, downloaded_index, archive=None):
+    return bvid in downloaded_index or (archive is not None and archive.contains('bilibili', bvid))
 
 # 下载视频函数
 def download_video(bvid):
@@ -249,14 +299,20 @@ def download_video(bvid):
     command = ['bbdown', '-ua', ua, bvid]
     try:
         subprocess.run(command, check=True)
+        return True
     except subprocess.CalledProcessError as e:
         logging.error(f"视频下载失败: {bvid}, 错误: {e}")
+        return False
 
 # 多线程下载视频
-def download_videos(bvid_list, download_dir, max_workers):
-    bvids_to_download = [bvid for bvid in bvid_list if not is_video_downloaded(bvid, download_dir)]
+def download_videos(bvid_list, download_dir, max_workers, archive=None):
+    downloaded_index = build_downloaded_index(download_dir)
+    archive = archive or DownloadArchive()
+    bvids_to_download = [bvid for bvid in bvid_list if not is_video_downloaded(bvid, downloaded_index, archive)]
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        executor.map(download_video, bvids_to_download)
+        for bvid, success in zip(bvids_to_download, executor.map(download_video, bvids_to_download)):
+            if success:
+                archive.add('bilibili', bvid)
 
 # 整合下载检查逻辑
 def check_and_download_videos(mid, EXCEL_FILE_PATH, download_dir, cookie, max_workers):
@@ -280,9 +336,12 @@ def check_and_download_videos(mid, EXCEL_FILE_PATH, download_dir, cookie, max_wo
     missing_count = 0
     missing_bvids = []
 
-    # 检测每个 bvid 是否存在于下载目录中
+    # 检测每个 bvid 是否已下载（只扫描一次目录；目录中的文件同时补录进下载归档）
+    downloaded_index = build_downloaded_index(download_dir)
+    archive = DownloadArchive()
+    archive.import_dir('bilibili', download_dir, BVID_PATTERN)
     for bvid in bvid_list:
-        if is_video_downloaded(bvid, download_dir):
+        if is_video_downloaded(bvid, downloaded_index, archive):
             existing_count += 1
         else:
             missing_count += 1
@@ -294,7 +353,7 @@ def check_and_download_videos(mid, EXCEL_FILE_PATH, download_dir, cookie, max_wo
     logging.info(f"不存在的具体BV号: {missing_bvids}")
 
     # 多线程下载未下载的视频
-    download_videos(missing_bvids, download_dir, max_workers)
+    download_videos(missing_bvids, download_dir, max_workers, archive)
 
 # 主程序入口
 if __name__ == "__main__":
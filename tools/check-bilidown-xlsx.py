@@ -1,16 +1,23 @@
 import os
+import re
 import pandas as pd
+from download_archive import DownloadArchive
 
 # 预设全局变量
 EXCEL_FILE_PATH = 'I:/bin/cache/bilibili_videos.xlsx'
 DOWNLOAD_DIR = r"L:\BiliUP-Arch\Cache"
 
-# 检查视频文件是否已存在
-def is_video_downloaded(bvid, download_dir):
-    for file_name in os.listdir(download_dir):
-        if bvid in file_name:
-            return True
-    return False
+# 文件名中的 BV 号
+BVID_PATTERN = re.compile(r'BV[0-9A-Za-z]{10}')
+
+# 一次扫描下载目录，建立文件名中出现过的 BV 号集合
+def build_downloaded_index(download_dir):
+    with os.scandir(download_dir) as entries:
+        return {bvid for entry in entries for bvid in BVID_PATTERN.findall(entry.name)}
+
+# 检查视频是否已下载：下载归档中有记录，或下载目录中存在对应文件
+def is_video_downloaded(bvid, downloaded_index, archive=None):
+    return bvid in downloaded_index or (archive is not None and archive.contains('bilibili', bvid))
 
 def main():
     # 检查是否存在目标的 bilibili_videos.xlsx 文件
@@ -27,9 +34,12 @@ def main():
     missing_count = 0
     missing_bvids = []
 
-    # 检测每个 bvid 是否存在于下载目录中
+    # 检测每个 bvid 是否已下载（只扫描一次目录；目录中的文件同时补录进下载归档）
+    downloaded_index = build_downloaded_index(DOWNLOAD_DIR)
+    archive = DownloadArchive()
+    archive.import_dir('bilibili', DOWNLOAD_DIR, BVID_PATTERN)
     for bvid in bvid_list:
-        if is_video_downloaded(bvid, DOWNLOAD_DIR):
+        if is_video_downloaded(bvid, downloaded_index, archive):
             existing_count += 1
         else:
             missing_count += 1
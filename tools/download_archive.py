@@ -0,0 +1,159 @@
+"""
+下载归档 - 各下载脚本共享的已下载视频记录
+
+按 (平台, 视频ID) 记录文件路径、大小和哈希，存放在一个 SQLite 文件中。
+启动时把全部键读入内存集合，查询为 O(1)；判断是否已下载只看ID，
+文件改名或在 Bili-{name} 目录之间移动后依然有效。
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+DEFAULT_ARCHIVE_FILE = os.getenv('DOWNLOAD_ARCHIVE', os.path.expanduser('~/.cache/b2y_download_archive.db'))
+
+# 下载中的临时文件后缀，这些文件和空文件不算已下载
+TEMP_FILE_SUFFIXES = ('.download', '.part', '.tmp', '.temp')
+
+# 快速哈希只读取文件头尾各1MB，几个GB的视频也能立即算完
+HASH_SAMPLE_SIZE = 1024 * 1024
+
+def quick_hash(path: str) -> str:
+    """文件大小 + 头尾采样的 SHA1，用于识别改名/移动后的同一文件"""
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(HASH_SAMPLE_SIZE))
+        if size > HASH_SAMPLE_SIZE * 2:
+            f.seek(-HASH_SAMPLE_SIZE, os.SEEK_END)
+            digest.update(f.read(HASH_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+class DownloadArchive:
+    """已下载视频归档，可在多个线程间共享"""
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS archive (
+                platform TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                path TEXT,
+                size INTEGER,
+                hash TEXT,
+                added_at TEXT,
+                PRIMARY KEY (platform, video_id)
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_archive_hash ON archive(hash)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_archive_size ON archive(size)')
+        self._conn.commit()
+        self._ids = set(self._conn.execute('SELECT platform, video_id FROM archive'))
+
+    def contains(self, platform: str, video_id: str) -> bool:
+        return (platform, video_id) in self._ids
+
+    def add(self, platform: str, video_id: str, path: Optional[str] = None, with_hash: bool = True):
+        """记录一个已下载视频；path 为文件时同时记录大小和哈希"""
+        size = file_hash = None
+        if path and os.path.isfile(path):
+            try:
+                size = os.path.getsize(path)
+                file_hash = quick_hash(path) if with_hash else None
+            except OSError:
+                pass
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO archive (platform, video_id, path, size, hash, added_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(platform, video_id) DO UPDATE SET
+                    path = COALESCE(excluded.path, path),
+                    size = COALESCE(excluded.size, size),
+                    hash = COALESCE(excluded.hash, hash)
+            ''', (platform, video_id, path, size, file_hash, datetime.now().isoformat(timespec='seconds')))
+            self._conn.commit()
+            self._ids.add((platform, video_id))
+
+    def get(self, platform: str, video_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT path, size, hash, added_at FROM archive WHERE platform = ? AND video_id = ?',
+                (platform, video_id)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('path', 'size', 'hash', 'added_at'), row))
+
+    def find_by_hash(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """按哈希查找记录，用于识别改名或移动过的文件"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT platform, video_id, path, size FROM archive WHERE hash = ?', (file_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('platform', 'video_id', 'path', 'size'), row))
+
+    def relocate(self, path: str, size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """文件名中没有视频ID时按哈希查找归档记录，找到时把记录的路径更新为该文件
+
+        只有大小与某条带哈希的记录相同、且该路径尚未归档时才计算哈希，不会逐个读取整个目录。
+        返回匹配的记录，没有时返回None。
+        """
+        size = os.path.getsize(path) if size is None else size
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT path FROM archive WHERE size = ? AND hash IS NOT NULL', (size,)
+            ).fetchall()
+        if not rows or any(row[0] and os.path.abspath(row[0]) == os.path.abspath(path) for row in rows):
+            return None
+        try:
+            entry = self.find_by_hash(quick_hash(path))
+        except OSError:
+            return None
+        if entry is None or entry['size'] != size:
+            return None
+        with self._lock:
+            self._conn.execute(
+                'UPDATE archive SET path = ? WHERE platform = ? AND video_id = ?',
+                (path, entry['platform'], entry['video_id'])
+            )
+            self._conn.commit()
+        entry['path'] = path
+        return entry
+
+    def import_dir(self, platform: str, directory: str, id_pattern) -> int:
+        """把目录中文件名带视频ID、尚未归档的文件补录进归档，返回新增数量
+
+        已有下载目录首次接入归档时使用；补录时不计算哈希，避免读取大量文件。
+        下载中断留下的临时文件和空文件跳过，下次仍会重新下载。文件名中没有视频ID的文件
+        按哈希识别改名或移动过的已归档文件，更新记录的路径。
+        """
+        added = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.endswith(TEMP_FILE_SUFFIXES):
+                    continue
+                size = entry.stat().st_size
+                if size == 0:
+                    continue
+                ids = id_pattern.findall(entry.name)
+                if not ids:
+                    self.relocate(entry.path, size)
+                    continue
+                for video_id in ids:
+                    if not self.contains(platform, video_id):
+                        self.add(platform, video_id, entry.path, with_hash=False)
+                        added += 1
+        return added
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
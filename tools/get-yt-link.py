@@ -1,21 +1,77 @@
-from bs4 import BeautifulSoup
-
-def extract_youtube_links(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    links = set()
-    for link in soup.find_all('a', href=True):
-        href = link['href']
-        if href.startswith('https://www.youtube.com/watch?v='):
-            links.add(href)
-    return links
-
-# 加载你的 HTML 文件内容
-with open('path_to_your_html_file.html', 'r', encoding='utf-8') as file:
-    html_content = file.read()
-
-# 调用函数
-youtube_links = extract_youtube_links(html_content)
-
-# 输出找到的 YouTube 链接
-for link in youtube_links:
-    print(link)
+import os
+import re
+import sys
+import html
+import argparse
+
+# 分块读取与 BBDown-Plus 的链接提取脚本共用
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BBDown-Plus'))
+from BATCH_BBDOWN_STREAM import iter_matches, CHUNK_SIZE
+
+LINK_PREFIX = 'https://www.youtube.com/watch?v='
+# 只匹配 <a> 标签的 href，与 bs4 的 find_all('a') 一致；标签内不会出现 '<'
+HREF_PATTERN = re.compile(r'''<a\b[^<>]*?\bhref=["'](https://www\.youtube\.com/watch\?v=[^"'\s]+)["']''', re.IGNORECASE)
+
+def iter_links_regex(file_path, chunk_size=CHUNK_SIZE):
+    """分块读取 HTML，用正则提取 <a> 的 href，内存占用与文件大小无关
+
+    标签中含有空白字符，每块处理到最后一个 '<' 之前，跨块的标签与下一块拼接后再匹配。
+    """
+    for link in iter_matches(file_path, HREF_PATTERN, chunk_size, cut_before='<'):
+        yield html.unescape(link)
+
+class _LinkCollector:
+    # lxml 解析器的 target：只接收标签事件，不构建文档树
+    def __init__(self):
+        self.links = []
+
+    def start(self, tag, attrib):
+        if tag == 'a':
+            href = attrib.get('href')
+            if href and href.startswith(LINK_PREFIX):
+                self.links.append(href)
+
+    def end(self, tag):
+        pass
+
+    def data(self, data):
+        pass
+
+    def close(self):
+        pass
+
+def iter_links_lxml(file_path, chunk_size=CHUNK_SIZE):
+    # lxml 分块喂入 HTML 解析器，能处理正则不好覆盖的不规则标签写法
+    from lxml import etree
+    collector = _LinkCollector()
+    parser = etree.HTMLParser(target=collector, encoding='utf-8')
+    with open(file_path, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from collector.links
+            collector.links.clear()
+    parser.close()
+    yield from collector.links
+
+def extract_youtube_links(file_path, parser='regex'):
+    """逐个产出去重后的 YouTube 链接"""
+    seen = set()
+    links = iter_links_lxml(file_path) if parser == 'lxml' else iter_links_regex(file_path)
+    for link in links:
+        if link not in seen:
+            seen.add(link)
+            yield link
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='从 HTML 文件（如观看记录导出）中提取 YouTube 视频链接')
+    parser.add_argument('file_path', nargs='?', default='path_to_your_html_file.html', help='HTML 文件路径')
+    parser.add_argument('--parser', choices=['regex', 'lxml'], default='regex',
+                        help='regex: 分块正则匹配（默认，最快）；lxml: 增量解析 HTML（需安装 lxml）')
+    args = parser.parse_args()
+
+    # 输出找到的 YouTube 链接，找到一个输出一个
+    for link in extract_youtube_links(args.file_path, args.parser):
+        print(link)
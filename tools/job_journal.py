@@ -0,0 +1,169 @@
+"""
+任务日志 - 记录每个视频的下载/上传状态，中断后重新运行时从日志恢复
+
+按 (平台, 视频ID) 记录一条任务，状态依次为：
+    discovered -> downloading -> downloaded -> uploaded
+失败时为 failed，并记录尝试次数和最后的错误。状态在动作开始前写入
+（先写日志再执行），进程崩溃或被 Ctrl-C 中断后仍停在 downloading 的任务
+视为未完成，下次运行时重新排队。
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterable
+
+DEFAULT_JOURNAL_FILE = os.getenv('JOB_JOURNAL', os.path.expanduser('~/.cache/b2y_jobs.db'))
+
+DISCOVERED = 'discovered'
+DOWNLOADING = 'downloading'
+DOWNLOADED = 'downloaded'
+UPLOADED = 'uploaded'
+FAILED = 'failed'
+
+# 已完成下载的状态，重新运行时不再处理
+DONE_STATES = (DOWNLOADED, UPLOADED)
+# 未完成的状态，重新运行时恢复
+UNFINISHED_STATES = (DISCOVERED, DOWNLOADING, FAILED)
+
+COLUMNS = ('platform', 'video_id', 'state', 'attempts', 'owner', 'folder', 'path', 'info', 'error', 'updated_at')
+
+class JobJournal:
+    """任务日志，可在多个线程间共享"""
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                platform TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                owner TEXT,
+                folder TEXT,
+                path TEXT,
+                info TEXT,
+                error TEXT,
+                updated_at TEXT,
+                PRIMARY KEY (platform, video_id)
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(platform, state)')
+        self._conn.commit()
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat(timespec='seconds')
+
+    def _row_to_dict(self, row) -> Dict[str, Any]:
+        job = dict(zip(COLUMNS, row))
+        job['info'] = json.loads(job['info']) if job['info'] else {}
+        return job
+
+    def discover(self, platform: str, jobs: Iterable[Dict[str, Any]]) -> int:
+        """批量登记新发现的任务，已有的任务保持原状态；返回新增数量
+
+        jobs 中每项包含 video_id，可选 owner、folder 和 info（恢复任务所需的视频信息）。
+        """
+        rows = [
+            (platform, job['video_id'], DISCOVERED, job.get('owner'), job.get('folder'),
+             json.dumps(job.get('info') or {}, ensure_ascii=False), self._now())
+            for job in jobs
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany('''
+                INSERT OR IGNORE INTO jobs (platform, video_id, state, owner, folder, info, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def start(self, platform: str, video_id: str) -> int:
+        """开始下载前调用：状态改为 downloading，尝试次数加1；返回本次是第几次尝试"""
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO jobs (platform, video_id, state, attempts, updated_at) VALUES (?, ?, ?, 1, ?)
+                ON CONFLICT(platform, video_id) DO UPDATE SET
+                    state = excluded.state, attempts = attempts + 1, updated_at = excluded.updated_at
+            ''', (platform, video_id, DOWNLOADING, self._now()))
+            self._conn.commit()
+            row = self._conn.execute(
+                'SELECT attempts FROM jobs WHERE platform = ? AND video_id = ?', (platform, video_id)
+            ).fetchone()
+        return row[0]
+
+    def set_state(self, platform: str, video_id: str, state: str,
+                  path: Optional[str] = None, error: Optional[str] = None):
+        """更新任务状态；path 为空时保留原有路径，进入非失败状态时清除错误信息"""
+        if path:
+            path = os.path.abspath(path)
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO jobs (platform, video_id, state, path, error, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(platform, video_id) DO UPDATE SET
+                    state = excluded.state,
+                    path = COALESCE(excluded.path, path),
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+            ''', (platform, video_id, state, path, error, self._now()))
+            self._conn.commit()
+
+    def get(self, platform: str, video_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {", ".join(COLUMNS)} FROM jobs WHERE platform = ? AND video_id = ?',
+                (platform, video_id)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def find_by_path(self, path: str) -> Optional[Dict[str, Any]]:
+        """按下载文件路径查找任务，用于上传时没有视频ID的情况"""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {", ".join(COLUMNS)} FROM jobs WHERE path = ?', (os.path.abspath(path),)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def unfinished(self, platform: str, owner: Optional[str] = None, max_attempts: int = 0) -> List[Dict[str, Any]]:
+        """未完成的任务；max_attempts 大于0时不包含已失败达到该次数的任务"""
+        query = f'SELECT {", ".join(COLUMNS)} FROM jobs WHERE platform = ? AND state IN (?, ?, ?)'
+        params = [platform, *UNFINISHED_STATES]
+        if owner is not None:
+            query += ' AND owner = ?'
+            params.append(owner)
+        if max_attempts > 0:
+            query += ' AND NOT (state = ? AND attempts >= ?)'
+            params.extend([FAILED, max_attempts])
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def by_state(self, platform: str, state: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """某个状态的任务，最近更新的在前"""
+        query = f'SELECT {", ".join(COLUMNS)} FROM jobs WHERE platform = ? AND state = ? ORDER BY updated_at DESC'
+        params = [platform, state]
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def counts(self, platform: str) -> Dict[str, int]:
+        """各状态的任务数"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT state, COUNT(*) FROM jobs WHERE platform = ? GROUP BY state', (platform,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,18 +1,123 @@
+import os
+import re
+import json
+import time
+import argparse
 import subprocess
 import concurrent.futures
+from datetime import datetime
+from download_archive import DownloadArchive
 
 # 设置下载目录和代理
 output_dir = 'H:\Youtube'
 proxy = 'socks5://127.0.0.1:10808'
 download_list_path = 'F:/Download/YouTube_Links.txt'
+cookies_path = r'C:\Users\SKY\AppData\Local\Google\Chrome\User Data\Default'
 
-# 读取所有的 YouTube 链接
-with open(download_list_path, 'r') as file:
-    links = [line.strip() for line in file if line.strip()]
+# 并发控制：从较少的并发开始，根据吞吐量和失败率在 [min, max] 之间调整
+MIN_WORKERS = 1
+MAX_WORKERS = 30
+START_WORKERS = 4
+ADJUST_INTERVAL = 60  # 每隔多少秒评估一次吞吐量，单位：秒
+ERROR_RATE_LIMIT = 0.2  # 一个周期内失败率超过此值时并发减半
 
-# 下载单个视频的函数
-def download_video(link):
-    cookies_path = r'C:\Users\SKY\AppData\Local\Google\Chrome\User Data\Default'
+# watch?v=ID、youtu.be/ID、shorts/ID 中的视频ID，用于下载归档去重
+VIDEO_ID_PATTERN = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/)([0-9A-Za-z_-]{11})')
+
+def get_video_id(link):
+    match = VIDEO_ID_PATTERN.search(link)
+    return match.group(1) if match else None
+
+def iter_links(path):
+    # 逐行读取链接列表，不一次性载入内存；同一链接只返回一次
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            link = line.strip()
+            if link and not link.startswith('#') and link not in seen:
+                seen.add(link)
+                yield link
+
+class DownloadLedger:
+    """下载记录（JSON Lines，追加写入），重新运行时跳过已完成的链接"""
+
+    def __init__(self, path):
+        self.path = path
+        self.status = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # 中途崩溃可能留下不完整的最后一行
+                    self.status[entry['link']] = entry['status']
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def record(self, link, status, **extra):
+        self.status[link] = status
+        entry = {'link': link, 'status': status, 'time': datetime.now().isoformat(timespec='seconds'), **extra}
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class ConcurrencyController:
+    """按周期统计下载吞吐量和失败率调整并发数
+
+    失败率过高时并发减半；否则爬山调整：吞吐量比上个周期明显提高就沿同一方向继续，
+    明显下降就反向调整。
+    """
+
+    def __init__(self, min_workers, max_workers, start_workers, interval=ADJUST_INTERVAL):
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.limit = max(min_workers, min(start_workers, max_workers))
+        self.interval = interval
+        self.direction = 1
+        self.last_throughput = None
+        self._reset_window()
+
+    def _reset_window(self):
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.window_success = 0
+        self.window_failed = 0
+
+    def record(self, success, size):
+        if success:
+            self.window_success += 1
+            self.window_bytes += size
+        else:
+            self.window_failed += 1
+
+    def maybe_adjust(self):
+        elapsed = time.monotonic() - self.window_start
+        finished = self.window_success + self.window_failed
+        if elapsed < self.interval or finished == 0:
+            return
+        throughput = self.window_bytes / elapsed
+        error_rate = self.window_failed / finished
+        old_limit = self.limit
+
+        if error_rate > ERROR_RATE_LIMIT:
+            self.limit = max(self.min_workers, self.limit // 2)
+            self.direction = 1
+            reason = f"失败率 {error_rate:.0%}"
+        else:
+            if self.last_throughput is not None and throughput < self.last_throughput * 0.95:
+                self.direction = -self.direction
+            self.limit = max(self.min_workers, min(self.max_workers, self.limit + self.direction))
+            reason = f"吞吐量 {throughput / 1024 / 1024:.1f} MB/s"
+        self.last_throughput = throughput
+
+        if self.limit != old_limit:
+            print(f"[并发] {reason}，并发数 {old_limit} -> {self.limit}")
+        self._reset_window()
+
+# 下载单个视频的函数，返回 (链接, 是否成功, 文件大小, 文件路径)
+def download_video(link, fragments=10):
     command = [
         'yt-dlp',
         '--format', 'bestvideo+bestaudio',
@@ -20,19 +125,86 @@ def download_video(link):
         '-o', f'{output_dir}/%(title)s.%(ext)s',
         '--proxy', proxy,
         '--cookies-from-browser', f'chrome:{cookies_path}',
-        '--concurrent-fragments', '10',  # 添加 --concurrent-fragments 参数
+        '--concurrent-fragments', str(fragments),  # 添加 --concurrent-fragments 参数
+        '--print', 'after_move:filepath',  # 输出最终文件路径，用于统计下载量
         link
     ]
-    subprocess.run(command, stdout=subprocess.PIPE)
+    result = subprocess.run(command, stdout=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+    if result.returncode != 0:
+        return link, False, 0, None
+    size = 0
+    file_path = None
+    for path in result.stdout.splitlines():
+        if os.path.isfile(path):
+            size += os.path.getsize(path)
+            file_path = path
+    return link, True, size, file_path
+
+# 按控制器给出的并发数逐个提交链接，完成一个再补充一个
+def download_videos_concurrently(links, ledger, controller, fragments=10, skip_failed=False, archive=None):
+    counts = {'done': 0, 'failed': 0, 'skipped': 0}
+
+    def handle(future):
+        link, success, size, file_path = future.result()
+        status = 'done' if success else 'failed'
+        counts[status] += 1
+        ledger.record(link, status, size=size)
+        video_id = get_video_id(link)
+        if success and archive is not None and video_id:
+            archive.add('youtube', video_id, file_path)
+        controller.record(success, size)
+        print(f"[{'完成' if success else '失败'}] {link}")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=controller.max_workers) as executor:
+        active = set()
+        submitted_ids = set()
+        for link in links:
+            while len(active) >= controller.limit:
+                done, active = concurrent.futures.wait(active, timeout=5, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    handle(future)
+                controller.maybe_adjust()
+
+            previous = ledger.status.get(link)
+            video_id = get_video_id(link)
+            # 同一视频的不同链接形式（youtu.be、带播放列表参数等）按视频ID去重
+            duplicate = video_id is not None and (
+                video_id in submitted_ids or (archive is not None and archive.contains('youtube', video_id))
+            )
+            if previous == 'done' or duplicate or (skip_failed and previous == 'failed'):
+                counts['skipped'] += 1
+                continue
+            if video_id:
+                submitted_ids.add(video_id)
+            active.add(executor.submit(download_video, link, fragments))
 
+        for future in concurrent.futures.as_completed(active):
+            handle(future)
+    return counts
 
-# 使用 ThreadPoolExecutor 来并发下载视频
-def download_videos_concurrently(links, max_workers=30):
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(download_video, link) for link in links]
-        for future in concurrent.futures.as_completed(futures):
-            future.result()
+def parse_args():
+    parser = argparse.ArgumentParser(description='使用 yt-dlp 批量下载 YouTube 视频，自动调整并发数并记录下载结果')
+    parser.add_argument('--list', default=download_list_path, help=f'链接列表文件（默认: {download_list_path}）')
+    parser.add_argument('--ledger', help='下载记录文件，已完成的链接再次运行时跳过（默认: 链接列表文件名 + .ledger.jsonl）')
+    parser.add_argument('--skip-failed', action='store_true', help='同时跳过之前失败的链接')
+    parser.add_argument('--no-archive', action='store_true', help='不使用共享下载归档（DOWNLOAD_ARCHIVE）')
+    parser.add_argument('--min-workers', type=int, default=MIN_WORKERS, help=f'最小并发数（默认: {MIN_WORKERS}）')
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS, help=f'最大并发数（默认: {MAX_WORKERS}）')
+    parser.add_argument('--start-workers', type=int, default=START_WORKERS, help=f'初始并发数（默认: {START_WORKERS}）')
+    parser.add_argument('--fragments', type=int, default=10, help='每个视频的分片并发数（默认: 10）')
+    return parser.parse_args()
 
 # 调用函数开始下载
 if __name__ == '__main__':
-    download_videos_concurrently(links)
+    args = parse_args()
+    ledger = DownloadLedger(args.ledger or args.list + '.ledger.jsonl')
+    controller = ConcurrencyController(max(1, args.min_workers), max(1, args.max_workers), args.start_workers)
+    archive = None if args.no_archive else DownloadArchive()
+    try:
+        counts = download_videos_concurrently(iter_links(args.list), ledger, controller, args.fragments,
+                                              args.skip_failed, archive)
+    finally:
+        ledger.close()
+        if archive is not None:
+            archive.close()
+    print(f"全部完成：成功 {counts['done']}，失败 {counts['failed']}，跳过 {counts['skipped']}")